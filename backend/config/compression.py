@@ -0,0 +1,17 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Levels used when compressing a response on the fly (cheap, per request)
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+BROTLI_LEVEL = int(os.getenv("COMPRESSION_BROTLI_LEVEL", "5"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+
+# Levels used when the pipeline publishes cacheable payloads (paid once per run)
+PUBLISH_ZSTD_LEVEL = int(os.getenv("PUBLISH_ZSTD_LEVEL", "19"))
+PUBLISH_BROTLI_LEVEL = int(os.getenv("PUBLISH_BROTLI_LEVEL", "11"))
+PUBLISH_GZIP_LEVEL = int(os.getenv("PUBLISH_GZIP_LEVEL", "9"))
+
+# Responses smaller than this are not worth compressing
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
@@ -1,15 +1,25 @@
-from fastapi import FastAPI, Query, BackgroundTasks, Header, HTTPException
+from fastapi import FastAPI, Query, BackgroundTasks, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+import asyncio
 from typing import List, Optional
 import os
 from datetime import datetime, timedelta, timezone
 
 from config.database import connect_to_mongo
-from schemas.significant_flood_point import SignificantFloodPoint, FloodCluster
+from schemas.significant_flood_point import FloodPointDelta
 from services.clustering_service import GeohashClusteringService
-# Import the functions from your scripts
-from scripts.update_pipeline_data import update_raw_points_for_run_date
-from scripts.generate_clusters import generate_clusters
+from services.delta_service import FloodDeltaService
+from services.compression_service import (
+    CompressionMiddleware, get_published_response, publish_payload, cluster_payload_key, SUMMARY_PAYLOAD_KEY
+)
+from schemas.published_payload import PublishedPayload
+from services.snapshot_service import snapshot_store, build_snapshot, prune_snapshots
+from services.nearest_service import nearest_service
+from services.partition_service import ForecastPartitionService
+from services.event_service import broadcaster, format_sse, get_latest_event, publish_data_version
+# The pipeline scripts are imported inside run_full_pipeline: they pull in
+# xarray, cdsapi, numpy and dask, which API workers never need to serve reads
 
 app = FastAPI()
 
@@ -21,6 +31,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiates zstd/br/gzip for every response; published payloads arrive precompressed
+app.add_middleware(CompressionMiddleware)
+
 @app.on_event("startup")
 def startup_db_client():
     connect_to_mongo()
@@ -32,6 +45,34 @@ def read_root():
 # --- MODIFIED ENDPOINT ---
 # In main.py, REPLACE your existing get_flood_points function with this one
 
+RETURN_PERIODS = ['2-year', '5-year', '20-year']
+RISK_LEVELS = ['low', 'medium', 'high', 'extreme']
+
+# Every field the endpoints return is in the matching covering index (see the schema
+# meta), so filtered queries are answered from the index without fetching documents
+POINT_RESPONSE_FIELDS = ['valid_for_date', 'lat', 'lon', 'forecast_value', 'return_period']
+CLUSTER_RESPONSE_FIELDS = [
+    'zoom_level', 'geohash', 'center_lat', 'center_lon', 'time', 'point_count',
+    'avg_forecast', 'max_forecast', 'min_forecast', 'risk_level'
+]
+
+def parse_value_set(values: Optional[List[str]], allowed: List[str], name: str) -> List[str]:
+    """Accept repeated (?x=a&x=b) and comma-separated (?x=a,b) values, rejecting unknown ones"""
+    parsed = []
+    for value in values or []:
+        parsed.extend(part.strip() for part in value.split(',') if part.strip())
+
+    unknown = sorted(set(parsed) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {', '.join(unknown)}. Expected one of {allowed}.")
+    return parsed
+
+def add_value_set_filter(query_filters: dict, field: str, values: List[str]):
+    if len(values) == 1:
+        query_filters[field] = values[0]
+    elif values:
+        query_filters[f'{field}__in'] = values
+
 @app.get("/api/flood-points")
 async def get_flood_points(
     limit: int = Query(default=2000, le=10000),
@@ -41,9 +82,14 @@ async def get_flood_points(
     north: Optional[float] = Query(None),
     south: Optional[float] = Query(None),
     east: Optional[float] = Query(None),
-    west: Optional[float] = Query(None)
+    west: Optional[float] = Query(None),
+    min_forecast: Optional[float] = Query(None, description="Only points with forecast_value >= min_forecast"),
+    max_forecast: Optional[float] = Query(None, description="Only points with forecast_value <= max_forecast"),
+    return_period: Optional[List[str]] = Query(None, description="Return periods to include, e.g. 5-year,20-year")
 ):
-    """Get flood points, now filtering by date AND geographic bounds."""
+    """Get flood points, filtering by date, geographic bounds, forecast value and return period."""
+    return_periods = parse_value_set(return_period, RETURN_PERIODS, 'return_period')
+
     try:
         query_filters = {}
         
@@ -57,21 +103,29 @@ async def get_flood_points(
             query_filters['lat__lte'] = north
             query_filters['lon__gte'] = west
             query_filters['lon__lte'] = east
+
+        if min_forecast is not None:
+            query_filters['forecast_value__gte'] = min_forecast
+        if max_forecast is not None:
+            query_filters['forecast_value__lte'] = max_forecast
+        add_value_set_filter(query_filters, 'return_period', return_periods)
         
-        points = SignificantFloodPoint.objects(**query_filters).skip(skip).limit(limit)
+        # Fans out over the per-run partitions
+        points, total_count = ForecastPartitionService().find_points(
+            skip=skip, limit=limit, only=POINT_RESPONSE_FIELDS, **query_filters
+        )
         
         result = []
         for point in points:
             result.append({
-                'id': str(point.id),
-                'time': point.valid_for_date,
-                'lat': point.lat,
-                'lon': point.lon,
-                'forecast_value': point.forecast_value,
-                'return_period': point.return_period
+                'id': str(point['_id']),
+                'time': point['valid_for_date'],
+                'lat': point['lat'],
+                'lon': point['lon'],
+                'forecast_value': point['forecast_value'],
+                'return_period': point['return_period']
             })
         
-        total_count = SignificantFloodPoint.objects(**query_filters).count()
         return {"points": result, "total": total_count}
     except Exception as e:
         return {"error": str(e)}
@@ -79,27 +133,48 @@ async def get_flood_points(
 # --- MODIFIED ENDPOINT ---
 @app.get("/api/flood-clusters")
 async def get_flood_clusters(
+    request: Request,
     zoom_level: int = Query(..., ge=0, le=20),
     time: Optional[str] = Query(None, description="Filter by valid_for_date (YYYY-MM-DD)"),
     north: Optional[float] = Query(None),
     south: Optional[float] = Query(None),
     east: Optional[float] = Query(None),
-    west: Optional[float] = Query(None)
+    west: Optional[float] = Query(None),
+    min_forecast: Optional[float] = Query(None, description="Only clusters holding a point with forecast_value >= min_forecast"),
+    max_forecast: Optional[float] = Query(None, description="Only clusters holding a point with forecast_value <= max_forecast"),
+    risk_level: Optional[List[str]] = Query(None, description="Risk levels to include, e.g. high,extreme")
 ):
-    """Get clustered flood data for a specific zoom level and viewport."""
+    """Get clustered flood data for a specific zoom level, viewport and value filters."""
+    risk_levels = parse_value_set(risk_level, RISK_LEVELS, 'risk_level')
+    has_bounds = all(coord is not None for coord in [north, south, east, west])
+    has_value_filters = min_forecast is not None or max_forecast is not None or risk_levels
+
     try:
+        # Whole-day requests are served from the payload published by the pipeline
+        if time and not has_bounds and not has_value_filters:
+            published = get_published_response(
+                cluster_payload_key(time, zoom_level), request.headers.get('accept-encoding', '')
+            )
+            if published is not None:
+                return published
+
         query_filters = {'zoom_level': zoom_level}
-        if time:
-            # Note: This should match the field in your FloodCluster model
-            query_filters['time'] = time 
         
-        if all(coord is not None for coord in [north, south, east, west]):
+        if has_bounds:
             query_filters['center_lat__gte'] = south
             query_filters['center_lat__lte'] = north
             query_filters['center_lon__gte'] = west
             query_filters['center_lon__lte'] = east
+
+        # A cluster matches when any of its points could: its range overlaps the filter
+        if min_forecast is not None:
+            query_filters['max_forecast__gte'] = min_forecast
+        if max_forecast is not None:
+            query_filters['min_forecast__lte'] = max_forecast
+        add_value_set_filter(query_filters, 'risk_level', risk_levels)
         
-        clusters = FloodCluster.objects(**query_filters)
+        # Each date is read from the partition of its latest run
+        clusters = ForecastPartitionService().iter_clusters(time, only=CLUSTER_RESPONSE_FIELDS, **query_filters)
         
         # --- KEY CHANGE: Manually build the result list ---
         result = []
@@ -123,82 +198,301 @@ async def get_flood_clusters(
     except Exception as e:
         return {"error": str(e)}
     
+
+@app.get("/api/flood-clusters/batch")
+async def get_flood_clusters_batch(
+    times: str = Query(..., description="Comma separated valid_for_dates (YYYY-MM-DD)"),
+    zoom_levels: str = Query(..., description="Comma separated zoom levels"),
+    north: Optional[float] = Query(None),
+    south: Optional[float] = Query(None),
+    east: Optional[float] = Query(None),
+    west: Optional[float] = Query(None)
+):
+    """
+    Get clusters for several dates (and zoom levels) of one viewport in one
+    round trip, e.g. to animate or prefetch the whole forecast window.
+    Cluster cells are shared and every value is a per-date column.
+    """
+    dates = [time.strip() for time in times.split(',') if time.strip()]
+    try:
+        levels = sorted({int(level) for level in zoom_levels.split(',') if level.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid zoom_levels.")
+    if not dates or not levels or not all(0 <= level <= 20 for level in levels):
+        raise HTTPException(status_code=400, detail="Provide at least one date and zoom levels between 0 and 20.")
+
+    bounds = None
+    if all(coord is not None for coord in [north, south, east, west]):
+        bounds = {'north': north, 'south': south, 'east': east, 'west': west}
+
+    try:
+        return GeohashClusteringService().get_batch_clusters_for_viewport(levels, bounds, dates)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@app.get("/api/flood-clusters/distribution")
+async def get_flood_distribution(
+    time: str = Query(..., description="Filter by valid_for_date (YYYY-MM-DD)"),
+    quantiles: str = Query("0.5,0.9,0.99", description="Comma separated quantiles between 0 and 1"),
+    zoom_level: Optional[int] = Query(None, ge=0, le=20, description="Cluster level to merge, defaults to the finest"),
+    north: Optional[float] = Query(None),
+    south: Optional[float] = Query(None),
+    east: Optional[float] = Query(None),
+    west: Optional[float] = Query(None)
+):
+    """
+    Get forecast value quantiles, a histogram and return period counts for a
+    viewport, merged from the sketches stored on its clusters.
+    """
+    try:
+        qs = [float(q) for q in quantiles.split(',') if q.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid quantiles.")
+    if not all(0 <= q <= 1 for q in qs):
+        raise HTTPException(status_code=400, detail="Quantiles must be between 0 and 1.")
+
+    bounds = None
+    if all(coord is not None for coord in [north, south, east, west]):
+        bounds = {'north': north, 'south': south, 'east': east, 'west': west}
+
+    try:
+        return GeohashClusteringService().get_distribution_for_viewport(bounds, time, qs, zoom_level)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# A plain def runs in the threadpool: building a date's KD-tree takes long
+# enough that it must not block the event loop (and the SSE streams on it)
+@app.get("/api/flood-points/nearest")
+def get_nearest_flood_points(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    time: str = Query(..., description="Filter by valid_for_date (YYYY-MM-DD)"),
+    k: int = Query(default=10, ge=1, le=1000),
+    max_km: Optional[float] = Query(None, gt=0, description="Only return points within this great-circle distance")
+):
+    """
+    Get the k flood points nearest to a location, closest first, with
+    distances in km. Point ids are snapshot-local ("<date>:<index>"), like
+    the drill-down's, and don't match the ids of /api/flood-points.
+    """
+    snapshot = snapshot_store.get(time)
+    if snapshot is None or not ForecastPartitionService().serves_snapshot(snapshot):
+        raise HTTPException(status_code=404, detail=f"No current point snapshot for {time}.")
+
+    try:
+        return nearest_service.find_nearest(snapshot, lat, lon, k, max_km)
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/api/flood-clusters/{geohash}/children")
+async def get_flood_cluster_children(
+    geohash: str,
+    time: str = Query(..., description="Filter by valid_for_date (YYYY-MM-DD)")
+):
+    """
+    Drill down into a cluster: returns the next zoom level's clusters inside
+    the parent geohash cell, or the raw points at the finest level.
+    """
+    clustering_service = GeohashClusteringService()
+    if not clustering_service.is_valid_geohash(geohash):
+        raise HTTPException(status_code=400, detail="Invalid geohash.")
+
+    # The snapshot is only used while it holds the run the API serves for the date;
+    # e.g. after a --replace import it is stale and the indexed query is used instead
+    snapshot = snapshot_store.get(time)
+    if snapshot is not None and not ForecastPartitionService().serves_snapshot(snapshot):
+        snapshot = None
+
+    try:
+        return clustering_service.get_sub_clusters(geohash, time, snapshot)
+    except Exception as e:
+        return {"error": str(e)}
+
     # In your main.py file, add this new endpoint:
 
 # In main.py, REPLACE your /api/flood-points/summary function with this one
 
-@app.get("/api/flood-points/summary")
-async def get_flood_summary():
+def build_flood_summary():
     """
-    Get a complete summary of all raw data points, including unique dates
+    Build the summary of all raw data points, including unique dates
     and a breakdown of points by risk level (return_period).
-    This is the single source of truth for the dashboard header.
     """
-    try:
-        # A $facet pipeline lets us run multiple aggregations in one stage
-        pipeline = [
-            {
-                "$facet": {
-                    # First aggregation: calculate overall stats and get dates
-                    "overall_stats": [
-                        {
-                            "$group": {
-                                "_id": None,
-                                "total_points": {"$sum": 1},
-                                "unique_dates": {"$addToSet": "$valid_for_date"}
-                            }
+    # A $facet pipeline lets us run multiple aggregations in one stage
+    pipeline = [
+        {
+            "$facet": {
+                # First aggregation: calculate overall stats and get dates
+                "overall_stats": [
+                    {
+                        "$group": {
+                            "_id": None,
+                            "total_points": {"$sum": 1},
+                            "unique_dates": {"$addToSet": "$valid_for_date"}
                         }
-                    ],
-                    # Second aggregation: get the counts for each risk level
-                    "risk_breakdown": [
-                        { "$group": { "_id": "$return_period", "count": {"$sum": 1} } }
-                    ]
-                }
+                    }
+                ],
+                # Second aggregation: get the counts for each risk level
+                "risk_breakdown": [
+                    { "$group": { "_id": "$return_period", "count": {"$sum": 1} } }
+                ]
             }
-        ]
-
-        result = list(SignificantFloodPoint.objects.aggregate(*pipeline))
+        }
+    ]
 
+    # Run it on the latest run of each date and merge the results
+    partition_service = ForecastPartitionService()
+    unique_dates = set()
+    return_period_counts = {}
+    for run_date, dates in partition_service.latest_point_routes().items():
+        result = list(partition_service.points(run_date).aggregate(
+            [{"$match": {"valid_for_date": {"$in": dates}}}] + pipeline
+        ))
         if not result or not result[0]['overall_stats']:
-            # Handle case with no data
-            return { "unique_dates": [], "risk_breakdown": {} }
+            continue
+        unique_dates.update(result[0]['overall_stats'][0].get("unique_dates", []))
+        for item in result[0]['risk_breakdown']:
+            return_period_counts[item['_id']] = return_period_counts.get(item['_id'], 0) + item.get('count', 0)
 
-        # --- Process the results ---
-        
-        # Process overall stats and dates
-        stats = result[0]['overall_stats'][0]
-        sorted_dates = sorted([d for d in stats.get("unique_dates", []) if d])
+    if not return_period_counts:
+        # Handle case with no data
+        return { "unique_dates": [], "risk_breakdown": {} }
+
+    # --- Process the results ---
+    
+    # Process overall stats and dates
+    sorted_dates = sorted([d for d in unique_dates if d])
+
+    # Process the risk breakdown
+    risk_counts = { "high": 0, "medium": 0, "low": 0 }
+    
+    # Map the database return periods to our frontend risk levels
+    risk_counts['high'] = return_period_counts.get('20-year', 0)
+    risk_counts['medium'] = return_period_counts.get('5-year', 0)
+    risk_counts['low'] = return_period_counts.get('2-year', 0)
+    
+    # Build the final JSON object with everything the frontend needs
+    return {
+        "unique_dates": sorted_dates,
+        "risk_breakdown": risk_counts
+    }
 
-        # Process the risk breakdown
-        risk_data = result[0]['risk_breakdown']
-        risk_counts = { "high": 0, "medium": 0, "low": 0 }
-        
-        # Map the database return periods to our frontend risk levels
-        for item in risk_data:
-            if item['_id'] == '20-year':
-                risk_counts['high'] = item.get('count', 0)
-            elif item['_id'] == '5-year':
-                risk_counts['medium'] = item.get('count', 0)
-            elif item['_id'] == '2-year':
-                risk_counts['low'] = item.get('count', 0)
-        
-        # Build the final JSON object with everything the frontend needs
-        return {
-            "unique_dates": sorted_dates,
-            "risk_breakdown": risk_counts
-        }
+
+@app.get("/api/flood-points/summary")
+async def get_flood_summary(request: Request):
+    """
+    Get a complete summary of all raw data points, including unique dates
+    and a breakdown of points by risk level (return_period).
+    This is the single source of truth for the dashboard header.
+    """
+    try:
+        published = get_published_response(SUMMARY_PAYLOAD_KEY, request.headers.get('accept-encoding', ''))
+        if published is not None:
+            return published
+
+        return build_flood_summary()
 
     except Exception as e:
         print(f"Error in /api/flood-points/summary: {e}")
         raise HTTPException(status_code=500, detail="Error fetching summary data.")
 
+@app.get("/api/flood-points/delta")
+async def get_flood_points_delta(
+    since_run: str = Query(..., description="The forecast_run_date the client already holds (YYYY-MM-DD)"),
+    time: Optional[str] = Query(None, description="Filter by valid_for_date (YYYY-MM-DD)")
+):
+    """
+    Get only the points added, changed or removed since the forecast run the
+    client already holds. Deltas are returned in the order they must be
+    applied; rows are [lat, lon, forecast_value, return_period] and removed
+    rows are [lat, lon].
+    """
+    latest_run = ForecastPartitionService().latest_run_date()
+
+    if latest_run is None or since_run >= latest_run:
+        return {"since_run": since_run, "latest_run": latest_run, "deltas": []}
+
+    deltas = FloodDeltaService().get_deltas_since(since_run, time)
+    if not deltas:
+        # The client's run is too old (or unknown) to be patched
+        raise HTTPException(status_code=410, detail="No delta available for since_run, reload all points.")
+
+    return {"since_run": since_run, "latest_run": latest_run, "deltas": deltas}
+
+# Comment lines keep idle SSE connections open through proxies
+SSE_HEARTBEAT_SECONDS = 15
+
+@app.get("/api/data-version")
+async def get_data_version():
+    """Get the current data version, available dates and last changed dates."""
+    return get_latest_event() or {}
+
+@app.get("/api/data-version/stream")
+async def stream_data_version(request: Request, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-sent event feed that announces every new data version as soon as
+    a pipeline run commits, so clients refetch only the changed dates
+    instead of polling.
+    """
+    async def event_stream():
+        queue = broadcaster.subscribe()
+        try:
+            # Bring the client up to date first, unless it reconnected with the latest id
+            latest = get_latest_event()
+            if latest and latest['id'] != last_event_id:
+                yield format_sse(latest)
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # --- NEW: Orchestrator and Secure Trigger Endpoint ---
 
 PIPELINE_API_KEY = os.getenv("PIPELINE_API_KEY")
 
+def publish_cacheable_payloads():
+    """
+    Render and precompress the payloads that only change when the pipeline
+    runs (whole-day clusters per zoom level for every served date, and the
+    summary), then drop any payload left over from earlier runs.
+    """
+    clustering_service = GeohashClusteringService()
+    published_keys = []
+
+    # Dates still served from an earlier run keep their payloads too
+    for date in ForecastPartitionService().available_dates():
+        for zoom_level in sorted(clustering_service.ZOOM_TO_PRECISION.keys()):
+            key = cluster_payload_key(date, zoom_level)
+            clusters = clustering_service.get_clusters_for_viewport(zoom_level, None, date)
+            sizes = publish_payload(key, {"clusters": clusters})
+            published_keys.append(key)
+            print(f"   ✅ Published {key} {sizes}")
+
+    publish_payload(SUMMARY_PAYLOAD_KEY, build_flood_summary())
+    published_keys.append(SUMMARY_PAYLOAD_KEY)
+
+    PublishedPayload.objects(key__nin=published_keys).delete()
+
 def run_full_pipeline():
     """The orchestrator that runs the full daily update process."""
     try:
+        # Loaded on first run only, see the note at the top of this module
+        from scripts.update_pipeline_data import update_raw_points_for_run_date
+        from scripts.generate_clusters import generate_clusters
+
         # 1. Set Date: Use yesterday's date for the new forecast run
         now_utc = datetime.now(timezone.utc)
         run_date = now_utc - timedelta(days=1)
@@ -206,26 +500,55 @@ def run_full_pipeline():
         # 2. Run Pipeline: Fetch and save the new 3-day forecast
         print("--- Starting background pipeline run ---")
         update_raw_points_for_run_date(run_date)
+
+        # 2b. Compute what changed since the previous run for delta clients
+        print("--- Computing deltas against the previous run ---")
+        changed_dates = FloodDeltaService().compute_run_deltas(run_date.strftime("%Y-%m-%d"))
         
         # 3. Generate Clusters: Run clustering for each of the next 3 days
+        # Clusters go into the new run's partition, which was created empty
         print("--- Starting background cluster generation ---")
-        FloodCluster.objects.delete()
-        print("✅ Cleared all existing clusters.")
+        run_date_str = run_date.strftime("%Y-%m-%d")
+        partition_service = ForecastPartitionService()
 
+        cluster_dates = []
         for i in range(3):
             cluster_date = run_date + timedelta(days=i+1)
             cluster_date_str = cluster_date.strftime("%Y-%m-%d")
-            generate_clusters(time=cluster_date_str)
+            generate_clusters(time=cluster_date_str, run_date=run_date_str)
+            cluster_dates.append(cluster_date_str)
 
         print("\n🏁 Hierarchical cluster generation complete for all dates!")
+
+        # 3b. Make the new run visible to the API in one registry update
+        partition_service.activate_partition(run_date_str)
+        print(f"✅ Activated partition for run date {run_date_str}.")
+
+        # 3c. Write the memory-mapped snapshots the API workers share; until
+        # they land, reads of the new run fall back to the database
+        print("--- Writing per-date snapshots ---")
+        for cluster_date_str in cluster_dates:
+            path = build_snapshot(cluster_date_str, run_date_str)
+            print(f"   ✅ Wrote {path}")
         
         # 4. Clean up old data (Keep 2 days of runs)
         print("--- Cleaning up old data ---")
         cutoff_date = run_date - timedelta(days=1)
         cutoff_date_str = cutoff_date.strftime("%Y-%m-%d")
         
-        SignificantFloodPoint.objects(forecast_run_date__lt=cutoff_date_str).delete()
-        FloodCluster.objects(time__lt=cutoff_date_str).delete()
+        # Whole run partitions are dropped instead of deleting documents
+        dropped_run_dates = partition_service.drop_partitions_before(cutoff_date_str)
+        print(f"✅ Dropped partitions for run dates: {dropped_run_dates}")
+        FloodPointDelta.objects(forecast_run_date__lt=cutoff_date_str).delete()
+        prune_snapshots(partition_service.available_dates())
+
+        # 5. Publish precompressed payloads for the new data
+        print("--- Publishing precompressed payloads ---")
+        publish_cacheable_payloads()
+
+        # 6. Announce the new data version to connected clients
+        event = publish_data_version(run_date_str, partition_service.available_dates(), changed_dates)
+        print(f"✅ Announced data version {event.version}.")
         
         print("--- 🎉 Full background process complete! ---")
     except Exception as e:
@@ -0,0 +1,15 @@
+from mongoengine import Document, StringField, ListField, DateTimeField
+
+class DataVersionEvent(Document):
+    version = StringField(required=True)           # Changes every time a pipeline run commits
+    forecast_run_date = StringField(required=True)
+    available_dates = ListField(StringField())     # Every valid_for_date the API can serve
+    changed_dates = ListField(StringField())       # Dates whose data differs from the previous version
+    published_at = DateTimeField(required=True)
+
+    # A capped collection keeps insertion order and can be tailed like a log
+    meta = {
+        'collection': 'data_version_events',
+        'max_documents': 1000,
+        'max_size': 1024 * 1024,
+    }
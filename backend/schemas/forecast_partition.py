@@ -0,0 +1,16 @@
+from mongoengine import Document, StringField, ListField, DateTimeField, IntField
+
+class ForecastPartition(Document):
+    forecast_run_date = StringField(required=True, unique=True)
+    points_collection = StringField(required=True)   # This run's significant_flood_points
+    clusters_collection = StringField(required=True) # This run's flood_clusters
+    status = StringField(required=True, choices=('building', 'active'), default='building')
+    valid_for_dates = ListField(StringField())       # Dates this run has points for
+    cluster_dates = ListField(StringField())         # Dates clustered into this run's clusters
+    created_at = DateTimeField(required=True)
+    version = IntField(default=0)                    # Bumped on every activation; snapshots record it
+    activated_at = DateTimeField()
+
+    meta = {
+        'collection': 'forecast_partitions',
+    }
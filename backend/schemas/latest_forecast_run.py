@@ -0,0 +1,11 @@
+from mongoengine import Document, StringField, DateTimeField
+
+# Maintained by ForecastPartitionService whenever a partition is activated or dropped
+class LatestForecastRun(Document):
+    valid_for_date = StringField(required=True, unique=True)
+    forecast_run_date = StringField(required=True) # The newest active run with points for this date
+    updated_at = DateTimeField(required=True)
+
+    meta = {
+        'collection': 'latest_forecast_runs',
+    }
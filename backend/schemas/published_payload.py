@@ -0,0 +1,13 @@
+from mongoengine import Document, StringField, BinaryField, DateTimeField
+
+class PublishedPayload(Document):
+    key = StringField(required=True, unique=True) # e.g. "clusters:2025-06-26:3"
+    media_type = StringField(required=True, default="application/json")
+    zstd = BinaryField()  # Each encoding is compressed once, when the pipeline publishes
+    br = BinaryField()
+    gzip = BinaryField()
+    published_at = DateTimeField(required=True)
+
+    meta = {
+        'collection': 'published_payloads',
+    }
@@ -1,4 +1,4 @@
-from mongoengine import Document, StringField, FloatField, IntField
+from mongoengine import Document, StringField, FloatField, IntField, ListField, DictField
 
 class SignificantFloodPoint(Document):
     forecast_run_date = StringField(required=True) # The day the forecast was made
@@ -7,17 +7,21 @@ class SignificantFloodPoint(Document):
     lon = FloatField(required=True)
     forecast_value = FloatField(required=True)
     return_period = StringField(required=True)
+    geohash = StringField()                        # Full-precision cell, used for prefix lookups
 
+    # Stored per forecast run in significant_flood_points_<YYYYMMDD>, see ForecastPartitionService
     meta = {
         'collection': 'significant_flood_points',
         'indexes': [
-            'forecast_run_date', # Good for fast daily cleanup
-            'valid_for_date',    # Good for filtering by date on the map
+            # Covers /api/flood-points: date, return period, value and area filters are
+            # answered and projected from the index alone, without fetching documents
+            [("valid_for_date", 1), ("return_period", 1), ("forecast_value", 1), ("lat", 1), ("lon", 1), ("_id", 1)],
             [("lat", 1), ("lon", 1)], # Good for filtering by map area
+            [("valid_for_date", 1), ("geohash", 1)], # Good for cluster drill-down
         ]
     }
 
-# The FloodCluster model can remain unchanged for now
+# Stored per forecast run in flood_clusters_<YYYYMMDD>, see ForecastPartitionService
 class FloodCluster(Document):
     zoom_level = IntField(required=True)
     geohash = StringField(required=True)
@@ -29,12 +33,35 @@ class FloodCluster(Document):
     max_forecast = FloatField(required=True)
     min_forecast = FloatField(required=True)
     risk_level = StringField(required=True)
+    # Mergeable summary of the cluster's points, see ForecastSketchService
+    histogram_bins = ListField(IntField())    # Sparse forecast_value histogram: bin indexes...
+    histogram_counts = ListField(IntField())  # ...and the number of points in each
+    return_period_counts = DictField()        # e.g. {'2-year': 12, '5-year': 3, '20-year': 0}
     
     meta = {
         'collection': 'flood_clusters',
         'indexes': [
             [('zoom_level', 1), ('time', 1), ('geohash', 1)],
             [('center_lat', 1), ('center_lon', 1)],
-            [('risk_level', 1)]
+            # Covers /api/flood-clusters: every filtered and returned field is in the index
+            [('zoom_level', 1), ('time', 1), ('risk_level', 1), ('max_forecast', 1), ('min_forecast', 1),
+             ('center_lat', 1), ('center_lon', 1), ('geohash', 1), ('point_count', 1), ('avg_forecast', 1), ('_id', 1)]
         ]
-    }
\ No newline at end of file
+    }
+
+class FloodPointDelta(Document):
+    forecast_run_date = StringField(required=True) # The run this delta leads to
+    base_run_date = StringField(required=True)     # The previous run it applies on top of
+    valid_for_date = StringField(required=True)
+    chunk = IntField(required=True, default=0)     # Large deltas are split across documents
+    added = ListField(ListField())    # [lat, lon, forecast_value, return_period]
+    changed = ListField(ListField())  # [lat, lon, forecast_value, return_period]
+    removed = ListField(ListField())  # [lat, lon]
+
+    meta = {
+        'collection': 'flood_point_deltas',
+        'indexes': [
+            [('base_run_date', 1), ('valid_for_date', 1), ('chunk', 1)],
+            'forecast_run_date', # Good for fast daily cleanup
+        ]
+    }
@@ -0,0 +1,68 @@
+import sys
+import os
+import json
+import time
+import urllib.request
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENCODINGS = ['identity', 'gzip', 'br', 'zstd']
+
+def fetch_wire_bytes(url: str, encoding: str):
+    """Fetch a URL with one Accept-Encoding and return the raw body size as sent"""
+    request = urllib.request.Request(url, headers={'Accept-Encoding': encoding})
+    start_time = time.time()
+    with urllib.request.urlopen(request) as response:
+        # urllib never decodes the body, so this is exactly what crossed the wire
+        body = response.read()
+        served_encoding = response.headers.get('Content-Encoding', 'identity')
+    end_time = time.time()
+    return len(body), served_encoding, end_time - start_time
+
+def benchmark_compression(base_url: str, paths, output: str = None):
+    """Record bytes on the wire for each encoding of each endpoint"""
+    results = []
+
+    for path in paths:
+        url = f"{base_url}{path}"
+        print(f"\n📦 {path}")
+
+        identity_bytes = None
+        for encoding in ENCODINGS:
+            wire_bytes, served_encoding, elapsed = fetch_wire_bytes(url, encoding)
+            if encoding == 'identity':
+                identity_bytes = wire_bytes
+            ratio = identity_bytes / wire_bytes if wire_bytes else 0
+
+            print(f"   {encoding:>8}: {wire_bytes:>12,} bytes "
+                  f"(served as {served_encoding}, {ratio:.1f}x, {elapsed * 1000:.1f}ms)")
+            results.append({
+                'path': path,
+                'requested_encoding': encoding,
+                'served_encoding': served_encoding,
+                'wire_bytes': wire_bytes,
+                'ratio': ratio,
+                'seconds': elapsed
+            })
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"\n✅ Results written to {output}")
+
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Record bytes on the wire for each response encoding')
+    parser.add_argument('--base-url', type=str, default='http://localhost:8000', help='Backend base URL')
+    parser.add_argument('--time', type=str, required=True, help='Date to benchmark (YYYY-MM-DD format)')
+    parser.add_argument('--output', type=str, help='Optional JSON file to write the results to')
+
+    args = parser.parse_args()
+
+    paths = ['/api/flood-points/summary']
+    paths += [f'/api/flood-clusters?zoom_level={zoom_level}&time={args.time}' for zoom_level in range(5)]
+    paths.append(f'/api/flood-points?time={args.time}&limit=10000')
+
+    benchmark_compression(args.base_url, paths, args.output)
@@ -0,0 +1,76 @@
+import sys
+import os
+import json
+import subprocess
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules only the pipeline needs; an API worker must come up without them
+FORBIDDEN_MODULES = ['xarray', 'cdsapi', 'numpy', 'dask', 'pandas', 'scipy']
+
+# Runs in a fresh interpreter, the way a newly scaled-out worker starts
+MEASURE_SCRIPT = """
+import json, resource, sys, time
+start_time = time.perf_counter()
+import main
+import_seconds = time.perf_counter() - start_time
+print(json.dumps({
+    'import_seconds': import_seconds,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': sorted(name.split('.')[0] for name in sys.modules)
+}))
+"""
+
+def measure_startup():
+    """Import the API in a fresh interpreter and return its import time, RSS and modules"""
+    result = subprocess.run(
+        [sys.executable, '-c', MEASURE_SCRIPT],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def benchmark_startup(runs: int, max_import_ms: float, max_rss_mb: float, output: str = None) -> bool:
+    """Measure API cold start over several runs and check it against the budget"""
+    samples = []
+    for run in range(runs):
+        sample = measure_startup()
+        samples.append(sample)
+        print(f"   run {run + 1}: {sample['import_seconds'] * 1000:.0f}ms, {sample['max_rss_mb']:.1f}MB RSS")
+
+    # The median run, so one noisy start doesn't fail the check
+    import_ms = sorted(sample['import_seconds'] for sample in samples)[runs // 2] * 1000
+    rss_mb = sorted(sample['max_rss_mb'] for sample in samples)[runs // 2]
+    loaded = sorted(set(FORBIDDEN_MODULES) & set(samples[0]['modules']))
+
+    print(f"\n⏱️  Import time: {import_ms:.0f}ms (budget {max_import_ms:.0f}ms)")
+    print(f"🧠 Peak RSS: {rss_mb:.1f}MB (budget {max_rss_mb:.0f}MB)")
+    if loaded:
+        print(f"❌ Pipeline modules loaded at import: {', '.join(loaded)}")
+
+    passed = import_ms <= max_import_ms and rss_mb <= max_rss_mb and not loaded
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump({
+                'import_ms': import_ms,
+                'max_rss_mb': rss_mb,
+                'forbidden_modules_loaded': loaded,
+                'passed': passed
+            }, file, indent=2)
+        print(f"✅ Results written to {output}")
+
+    print("✅ Within the startup budget" if passed else "❌ Over the startup budget")
+    return passed
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Check API worker import time and memory against a budget')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreter starts to measure')
+    parser.add_argument('--max-import-ms', type=float, default=500, help='Import time budget in milliseconds')
+    parser.add_argument('--max-rss-mb', type=float, default=120, help='Peak RSS budget in megabytes')
+    parser.add_argument('--output', type=str, help='Optional JSON file to write the results to')
+
+    args = parser.parse_args()
+
+    if not benchmark_startup(args.runs, args.max_import_ms, args.max_rss_mb, args.output):
+        sys.exit(1)
@@ -5,7 +5,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.database import connect_to_mongo
 from services.clustering_service import GeohashClusteringService
 
-def generate_clusters(time: str = None):
+def generate_clusters(time: str = None, run_date: str = None):
     """Generate clustered data for all zoom levels"""
     try:
         # Connect to MongoDB
@@ -16,7 +16,7 @@ def generate_clusters(time: str = None):
         clustering_service = GeohashClusteringService()
         
         # Generate clusters for all zoom levels
-        clustering_service.generate_all_zoom_clusters(time)
+        clustering_service.generate_all_zoom_clusters(time, run_date)
         
         # print("Cluster generation completed successfully!")
         
@@ -29,7 +29,8 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description='Generate clustered flood data for all zoom levels')
     parser.add_argument('--time', type=str, help='Specific date to cluster (YYYY-MM-DD format)')
+    parser.add_argument('--run-date', type=str, help='Forecast run whose partition receives the clusters (defaults to the newest run)')
     
     args = parser.parse_args()
     
-    generate_clusters(args.time) 
\ No newline at end of file
+    generate_clusters(args.time, args.run_date) 
\ No newline at end of file
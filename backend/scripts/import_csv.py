@@ -1,57 +1,182 @@
-import csv
 import sys
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.database import connect_to_mongo
-from schemas.significant_flood_point import SignificantFloodPoint
+from services.clustering_service import GeohashClusteringService
+from services.partition_service import ForecastPartitionService
+from services.snapshot_service import build_snapshot
 
-def import_csv_data(csv_file_path):
-    """Import data from CSV file into MongoDB"""
+# SignificantFloodPoint field -> column name in the source file
+DEFAULT_COLUMN_MAP = {
+    'forecast_run_date': 'forecast_run_date',
+    'valid_for_date': 'valid_for_date',
+    'lat': 'lat',
+    'lon': 'lon',
+    'forecast_value': 'forecast_value',
+    'return_period': 'return_period',
+}
+
+GEOHASH_BASE32 = np.frombuffer(b'0123456789bcdefghjkmnpqrstuvwxyz', dtype=np.uint8)
+
+def encode_geohash_array(lats: np.ndarray, lons: np.ndarray, precision: int) -> np.ndarray:
+    """Vectorized version of GeohashClusteringService.encode_geohash for whole columns"""
+    lat_min, lat_max = np.full(len(lats), -90.0), np.full(len(lats), 90.0)
+    lon_min, lon_max = np.full(len(lons), -180.0), np.full(len(lons), 180.0)
+    codes = np.zeros((len(lats), precision), dtype=np.uint8)
+
+    for bit in range(precision * 5):
+        if bit % 2 == 0:
+            mid = (lon_min + lon_max) / 2
+            is_set = lons >= mid
+            lon_min = np.where(is_set, mid, lon_min)
+            lon_max = np.where(is_set, lon_max, mid)
+        else:
+            mid = (lat_min + lat_max) / 2
+            is_set = lats >= mid
+            lat_min = np.where(is_set, mid, lat_min)
+            lat_max = np.where(is_set, lat_max, mid)
+        codes[:, bit // 5] |= is_set.astype(np.uint8) << (4 - bit % 5)
+
+    return GEOHASH_BASE32[codes].view(f'S{precision}').ravel().astype(str)
+
+def read_chunks(file_path: str, column_map: dict, chunk_size: int):
+    """Stream a CSV or Parquet file as DataFrames of at most chunk_size rows"""
+    columns = sorted(set(column_map.values()))
+
+    if file_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(file_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(file_path, usecols=columns, chunksize=chunk_size)
+
+def prepare_chunk(chunk: pd.DataFrame, column_map: dict, run_date: str = None) -> pd.DataFrame:
+    """Map source columns onto the SignificantFloodPoint schema and add geohashes"""
+    frame = pd.DataFrame({field: chunk[column] for field, column in column_map.items()})
+    if run_date:
+        frame['forecast_run_date'] = run_date
+    frame = frame.dropna()
+
+    frame['lat'] = frame['lat'].astype(float)
+    frame['lon'] = frame['lon'].astype(float)
+    frame['forecast_value'] = frame['forecast_value'].astype(float)
+    for field in ('forecast_run_date', 'valid_for_date', 'return_period'):
+        frame[field] = frame[field].astype(str)
+
+    frame['geohash'] = encode_geohash_array(
+        frame['lat'].to_numpy(), frame['lon'].to_numpy(),
+        GeohashClusteringService.POINT_GEOHASH_PRECISION
+    )
+    return frame
+
+def insert_chunk(collection, records: list) -> int:
+    """Unordered bulk insert, so the server can apply the batch in parallel"""
+    if not records:
+        return 0
+    result = collection.insert_many(records, ordered=False)
+    return len(result.inserted_ids)
+
+def import_points(file_path: str, column_map: dict = None, run_date: str = None,
+                  replace: bool = False, chunk_size: int = 50000, workers: int = 4):
+    """
+    Stream a CSV or Parquet file of points into MongoDB. Chunks are parsed
+    with pandas/pyarrow and written by a pool of workers into the partition
+    of their forecast_run_date. With replace, only the partitions of the
+    imported run date(s) are recreated first. Each imported run is then
+    re-clustered, activated and snapshotted, as a pipeline run would be.
+    """
     try:
-        # Connect to MongoDB
         connect_to_mongo()
         print("Connected to MongoDB")
-        
-        # Clear existing data (optional - comment out if you want to keep existing data)
-        SignificantFloodPoint.objects.delete()
-        print("Cleared existing data")
-        
-        # Read CSV and prepare data for bulk insert
-        documents = []
-        with open(csv_file_path, 'r') as file:
-            csv_reader = csv.DictReader(file)
-            
-            for row in csv_reader:
-                document = SignificantFloodPoint(
-                    time=row['time'],
-                    lat=float(row['lat']),
-                    lon=float(row['lon']),
-                    forecast_value=float(row['forecast_value'])
-                )
-                documents.append(document)
-        
-        # Bulk insert all documents
-        if documents:
-            SignificantFloodPoint.objects.insert(documents)
-            print(f"Bulk inserted {len(documents)} documents")
-        
-        print(f"Successfully imported data from {csv_file_path}")
-        
-        # Print summary
-        total_count = SignificantFloodPoint.objects.count()
-        print(f"Total records in database: {total_count}")
-        
+
+        column_map = dict(column_map or DEFAULT_COLUMN_MAP)
+        if run_date:
+            # Every row belongs to one run, the file doesn't need the column
+            column_map.pop('forecast_run_date', None)
+
+        partition_service = ForecastPartitionService()
+        imported_run_dates = set()
+        inserted_total = 0
+        start_time = time.time()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+
+            for chunk in read_chunks(file_path, column_map, chunk_size):
+                frame = prepare_chunk(chunk, column_map, run_date)
+
+                for chunk_run_date, run_frame in frame.groupby('forecast_run_date'):
+                    if chunk_run_date not in imported_run_dates:
+                        # Recreating before the first insert of a run keeps the replacement scoped to it
+                        if replace:
+                            partition_service.create_partition(chunk_run_date)
+                            print(f"Recreated partition for run date {chunk_run_date}")
+                        else:
+                            partition_service.get_or_create_partition(chunk_run_date)
+                        imported_run_dates.add(chunk_run_date)
+
+                    # Keep a bounded number of chunks in memory while workers insert
+                    if len(pending) >= workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        inserted_total += sum(future.result() for future in done)
+
+                    collection = partition_service.points(chunk_run_date)._collection
+                    pending.add(executor.submit(insert_chunk, collection, run_frame.to_dict('records')))
+
+            inserted_total += sum(future.result() for future in wait(pending).done)
+
+        clustering_service = GeohashClusteringService()
+        for imported_run_date in sorted(imported_run_dates):
+            # Replaced or appended points invalidate the run's clusters and snapshots
+            clustering_service.generate_all_zoom_clusters(None, imported_run_date)
+            partition_service.activate_partition(imported_run_date)
+            print(f"Activated partition for run date {imported_run_date}")
+
+            # Snapshots are per date, so only dates this run now serves are rewritten
+            for valid_for_date in partition_service.latest_point_routes().get(imported_run_date, []):
+                path = build_snapshot(valid_for_date, imported_run_date)
+                print(f"Wrote {path}")
+
+        elapsed = time.time() - start_time
+        print(f"Bulk inserted {inserted_total:,} points in {elapsed:.1f}s")
+        print(f"Successfully imported data from {file_path}")
+
     except Exception as e:
         print(f"Error importing data: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    csv_file = "significant_flood_points.csv"
-    
-    if not os.path.exists(csv_file):
-        print(f"CSV file '{csv_file}' not found in current directory")
-        print("Please make sure the CSV file is in the same directory as this script")
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Import flood points from a CSV or Parquet file')
+    parser.add_argument('file', type=str, nargs='?', default='significant_flood_points.csv',
+                        help='CSV or Parquet file to import')
+    parser.add_argument('--map', type=str, action='append', default=[], metavar='FIELD=COLUMN',
+                        help='Read a schema field from a differently named column, e.g. valid_for_date=time')
+    parser.add_argument('--run-date', type=str, help='forecast_run_date for every row (YYYY-MM-DD format)')
+    parser.add_argument('--replace', action='store_true', help='Replace the partitions of the imported run date(s)')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Rows per parsed and inserted chunk')
+    parser.add_argument('--workers', type=int, default=4, help='Parallel insert workers')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"File '{args.file}' not found")
         sys.exit(1)
-    
-    import_csv_data(csv_file) 
\ No newline at end of file
+
+    column_map = dict(DEFAULT_COLUMN_MAP)
+    for mapping in args.map:
+        field, _, column = mapping.partition('=')
+        if field not in DEFAULT_COLUMN_MAP or not column:
+            print(f"Invalid column mapping '{mapping}', expected FIELD=COLUMN with FIELD one of {list(DEFAULT_COLUMN_MAP)}")
+            sys.exit(1)
+        column_map[field] = column
+
+    import_points(args.file, column_map, args.run_date, args.replace, args.chunk_size, args.workers)
@@ -0,0 +1,102 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mongoengine.connection import get_db
+from config.database import connect_to_mongo
+from services.clustering_service import GeohashClusteringService
+from services.partition_service import ForecastPartitionService
+
+# The single collections every run was stored in before per-run partitions
+LEGACY_POINTS_COLLECTION = 'significant_flood_points'
+LEGACY_CLUSTERS_COLLECTION = 'flood_clusters'
+
+def copy_run_points(legacy_points, partition_service: ForecastPartitionService,
+                    run_date: str, batch_size: int) -> int:
+    """Copy one run's legacy points into its partition, adding missing geohashes"""
+    clustering_service = GeohashClusteringService()
+    collection = partition_service.points(run_date)._collection
+    copied, batch = 0, []
+
+    for point in legacy_points.find({'forecast_run_date': run_date}, {'_id': 0}):
+        if not point.get('geohash'):
+            point['geohash'] = clustering_service.encode_geohash(
+                point['lat'], point['lon'], clustering_service.POINT_GEOHASH_PRECISION
+            )
+        batch.append(point)
+        if len(batch) >= batch_size:
+            collection.insert_many(batch, ordered=False)
+            copied += len(batch)
+            batch = []
+
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        copied += len(batch)
+    return copied
+
+def migrate_legacy_collections(batch_size: int = 20000, keep_legacy: bool = False):
+    """
+    Split the legacy significant_flood_points collection into one active
+    partition per forecast_run_date, regenerate each run's clusters and drop
+    the legacy collections. Runs that already have an active partition are
+    skipped and half-copied 'building' ones are recreated, so the migration
+    can be re-run after an interruption. The legacy collections are only
+    dropped once every legacy run has an active partition.
+    """
+    try:
+        connect_to_mongo()
+        print("Connected to MongoDB")
+
+        db = get_db()
+        if LEGACY_POINTS_COLLECTION not in db.list_collection_names():
+            print("No legacy collections found, nothing to migrate.")
+            return
+
+        legacy_points = db[LEGACY_POINTS_COLLECTION]
+        partition_service = ForecastPartitionService()
+        active_run_dates = set(partition_service.active_run_dates())
+        run_dates = sorted(legacy_points.distinct('forecast_run_date'))
+        print(f"📦 Found legacy points for run dates: {run_dates}")
+
+        for run_date in run_dates:
+            if run_date in active_run_dates:
+                print(f"   ⏭️  {run_date} already has an active partition, skipping.")
+                continue
+
+            # Built as 'building' so reads never see a half-copied run; a
+            # leftover from an interrupted migration is dropped and recopied
+            partition_service.create_partition(run_date)
+            copied = copy_run_points(legacy_points, partition_service, run_date, batch_size)
+            print(f"   ✅ Copied {copied:,} points for run date {run_date}")
+
+            # Legacy clusters have no run and no histograms, so they are rebuilt per run
+            GeohashClusteringService().generate_all_zoom_clusters(None, run_date)
+            partition_service.activate_partition(run_date)
+            print(f"   ✅ Activated partition for run date {run_date}")
+
+        missing_run_dates = sorted(set(run_dates) - set(partition_service.active_run_dates()))
+        if keep_legacy:
+            print("Keeping the legacy collections (--keep-legacy).")
+        elif missing_run_dates:
+            print(f"⚠️  Keeping the legacy collections, run dates without an active partition: {missing_run_dates}")
+        else:
+            db.drop_collection(LEGACY_POINTS_COLLECTION)
+            db.drop_collection(LEGACY_CLUSTERS_COLLECTION)
+            print(f"🗑️  Dropped {LEGACY_POINTS_COLLECTION} and {LEGACY_CLUSTERS_COLLECTION}")
+
+        print("🎉 Migration complete!")
+
+    except Exception as e:
+        print(f"Error migrating legacy collections: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Move the legacy single-collection data into per-run partitions')
+    parser.add_argument('--batch-size', type=int, default=20000, help='Points per bulk insert')
+    parser.add_argument('--keep-legacy', action='store_true', help='Do not drop the legacy collections afterwards')
+
+    args = parser.parse_args()
+
+    migrate_legacy_collections(args.batch_size, args.keep_legacy)
@@ -1,11 +1,12 @@
 import sys
 import os
 import time
+from itertools import islice
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.database import connect_to_mongo
-from schemas.significant_flood_point import SignificantFloodPoint, FloodCluster
 from services.clustering_service import GeohashClusteringService
+from services.partition_service import ForecastPartitionService
 
 def test_clustering_performance():
     """Test clustering performance and show improvements"""
@@ -15,12 +16,16 @@ def test_clustering_performance():
         print("Connected to MongoDB")
         
         # Get raw data count
-        raw_count = SignificantFloodPoint.objects.count()
+        partition_service = ForecastPartitionService()
+        raw_count = sum(
+            partition_service.points(run_date)(valid_for_date__in=dates).count()
+            for run_date, dates in partition_service.latest_point_routes().items()
+        )
         print(f"\n📊 Raw Data Statistics:")
         print(f"   Total flood points: {raw_count:,}")
         
         # Get unique dates
-        unique_dates = SignificantFloodPoint.objects.distinct('time')
+        unique_dates = partition_service.available_dates()
         print(f"   Unique dates: {len(unique_dates)}")
         print(f"   Date range: {min(unique_dates)} to {max(unique_dates)}")
         
@@ -101,7 +106,7 @@ def test_cluster_quality():
         for zoom_level in [5, 10]:
             print(f"\n   Zoom Level {zoom_level}:")
             
-            clusters = FloodCluster.objects(zoom_level=zoom_level).limit(5)
+            clusters = islice(ForecastPartitionService().iter_clusters(zoom_level=zoom_level), 5)
             
             for i, cluster in enumerate(clusters):
                 print(f"     Cluster {i+1}:")
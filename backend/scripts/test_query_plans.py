@@ -0,0 +1,126 @@
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import connect_to_mongo
+from schemas.significant_flood_point import SignificantFloodPoint
+from services.clustering_service import GeohashClusteringService
+from services.partition_service import ForecastPartitionService
+from main import POINT_RESPONSE_FIELDS, CLUSTER_RESPONSE_FIELDS
+
+# A scratch partition far from any real forecast run, dropped afterwards
+TEST_RUN_DATE = '1970-01-01'
+TEST_DATE = '1970-01-02'
+
+# Same filters the API builds for /api/flood-points
+POINT_QUERIES = {
+    'date': {'valid_for_date': TEST_DATE},
+    'date + bbox': {'valid_for_date': TEST_DATE, 'lat__gte': 45, 'lat__lte': 55, 'lon__gte': 0, 'lon__lte': 10},
+    'date + min_forecast': {'valid_for_date': TEST_DATE, 'forecast_value__gte': 500},
+    'date + return_period': {'valid_for_date': TEST_DATE, 'return_period': '20-year'},
+    # Undated reads are split per latest run into a valid_for_date $in query
+    'dates + min_forecast': {'valid_for_date__in': [TEST_DATE, '1970-01-03'], 'forecast_value__gte': 500},
+    'all filters': {
+        'valid_for_date': TEST_DATE, 'return_period__in': ['5-year', '20-year'],
+        'forecast_value__gte': 200, 'forecast_value__lte': 800,
+        'lat__gte': 45, 'lat__lte': 55, 'lon__gte': 0, 'lon__lte': 10
+    },
+}
+
+# Same filters the API builds for /api/flood-clusters
+CLUSTER_QUERIES = {
+    'zoom + date': {'zoom_level': 3, 'time': TEST_DATE},
+    'zoom + date + bbox': {
+        'zoom_level': 3, 'time': TEST_DATE,
+        'center_lat__gte': 45, 'center_lat__lte': 55, 'center_lon__gte': 0, 'center_lon__lte': 10
+    },
+    'all filters': {
+        'zoom_level': 3, 'time': TEST_DATE, 'risk_level__in': ['high', 'extreme'],
+        'max_forecast__gte': 200, 'min_forecast__lte': 800,
+        'center_lat__gte': 45, 'center_lat__lte': 55, 'center_lon__gte': 0, 'center_lon__lte': 10
+    },
+}
+
+def plan_stages(plan: dict):
+    """Yield every stage name of an explain plan tree"""
+    plan = plan.get('queryPlan', plan)
+    if 'stage' in plan:
+        yield plan['stage']
+    for child in [plan.get('inputStage')] + plan.get('inputStages', []):
+        if child:
+            yield from plan_stages(child)
+
+def check_covered(name: str, explain: dict) -> bool:
+    """A query is covered when it never fetches a document"""
+    stages = list(plan_stages(explain['queryPlanner']['winningPlan']))
+    docs_examined = explain['executionStats']['totalDocsExamined']
+    covered = 'FETCH' not in stages and 'COLLSCAN' not in stages and docs_examined == 0
+
+    print(f"   {'✅' if covered else '❌'} {name}: {' <- '.join(stages)}, {docs_examined} docs examined")
+    return covered
+
+def explain_count(collection, query: dict) -> dict:
+    """
+    Explain a count the way QuerySet.count() runs it: pymongo's
+    count_documents is a $match/$group aggregation, not the count command
+    """
+    pipeline = [{'$match': query}, {'$group': {'_id': 1, 'n': {'$sum': 1}}}]
+    explain = collection.database.command(
+        'explain', {'aggregate': collection.name, 'pipeline': pipeline, 'cursor': {}},
+        verbosity='executionStats'
+    )
+    if 'queryPlanner' in explain:
+        # The whole pipeline was pushed down into the query engine
+        return explain
+    # Otherwise the index access is planned in the leading $cursor stage
+    return explain['stages'][0]['$cursor']
+
+def seed_partition(partition_service: ForecastPartitionService, point_count: int = 5000):
+    """Create the scratch partition with random points and their clusters"""
+    partition_service.create_partition(TEST_RUN_DATE)
+    clustering_service = GeohashClusteringService()
+
+    points = []
+    for _ in range(point_count):
+        lat, lon = random.uniform(40, 60), random.uniform(-5, 20)
+        points.append(SignificantFloodPoint(
+            forecast_run_date=TEST_RUN_DATE, valid_for_date=TEST_DATE, lat=lat, lon=lon,
+            forecast_value=random.uniform(10, 1000), return_period=random.choice(['2-year', '5-year', '20-year']),
+            geohash=clustering_service.encode_geohash(lat, lon, clustering_service.POINT_GEOHASH_PRECISION)
+        ))
+    partition_service.points(TEST_RUN_DATE).insert(points, load_bulk=False)
+
+    clusters = clustering_service.cluster_points_by_zoom(3, TEST_DATE, run_dates=[TEST_RUN_DATE])
+    partition_service.clusters(TEST_RUN_DATE).insert(clusters, load_bulk=False)
+
+def test_query_plans() -> bool:
+    """Check that every filtered point and cluster query is answered from an index alone"""
+    connect_to_mongo()
+    print("Connected to MongoDB")
+
+    partition_service = ForecastPartitionService()
+    seed_partition(partition_service)
+    passed = True
+
+    try:
+        print(f"\n🔍 /api/flood-points queries:")
+        points = partition_service.points(TEST_RUN_DATE)
+        for name, filters in POINT_QUERIES.items():
+            queryset = points(**filters)
+            passed &= check_covered(name, queryset.only(*POINT_RESPONSE_FIELDS).explain())
+            passed &= check_covered(f"{name} (count)", explain_count(queryset._collection, queryset._query))
+
+        print(f"\n🔍 /api/flood-clusters queries:")
+        clusters = partition_service.clusters(TEST_RUN_DATE)
+        for name, filters in CLUSTER_QUERIES.items():
+            passed &= check_covered(name, clusters(**filters).only(*CLUSTER_RESPONSE_FIELDS).explain())
+    finally:
+        partition_service.drop_partition(TEST_RUN_DATE)
+
+    print(f"\n{'✅ All queries are covered by an index' if passed else '❌ Some queries fetch documents'}")
+    return passed
+
+if __name__ == "__main__":
+    if not test_query_plans():
+        sys.exit(1)
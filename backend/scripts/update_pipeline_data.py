@@ -10,6 +10,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.database import connect_to_mongo
 from schemas.significant_flood_point import SignificantFloodPoint
+from services.clustering_service import GeohashClusteringService
+from services.partition_service import ForecastPartitionService
 
 def update_raw_points_for_run_date(run_date: datetime):
     """
@@ -27,6 +29,7 @@ def update_raw_points_for_run_date(run_date: datetime):
     THRESHOLD_5_YR_FILE = os.path.join(scripts_dir, "flood_threshold_glofas_v4_rl_5.0.nc")
     THRESHOLD_2_YR_FILE = os.path.join(scripts_dir, "flood_threshold_glofas_v4_rl_2.0.nc")
     MINIMUM_DISCHARGE = 10.0
+    geohash_service = GeohashClusteringService()
 
     # --- 2. FETCH FORECAST DATA ---
     print(f"\n🚀 Fetching 3-day forecast for run date: {run_date_str}...")
@@ -47,10 +50,13 @@ def update_raw_points_for_run_date(run_date: datetime):
     t5_ds = xr.open_dataset(THRESHOLD_5_YR_FILE, chunks="auto").reindex_like(forecast_ds, method="nearest")
     t2_ds = xr.open_dataset(THRESHOLD_2_YR_FILE, chunks="auto").reindex_like(forecast_ds, method="nearest")
     
-    # --- 4. CONNECT TO DB & PERFORM SAFE DELETE ---
+    # --- 4. CONNECT TO DB & CREATE THE RUN'S PARTITION ---
+    # The partition stays 'building' (invisible to the API) until the pipeline activates it
     connect_to_mongo()
-    SignificantFloodPoint.objects(forecast_run_date=run_date_str).delete()
-    print(f"\n🚀 Cleared old data for run date {run_date_str}.")
+    partition_service = ForecastPartitionService()
+    partition_service.create_partition(run_date_str)
+    run_points = partition_service.points(run_date_str)
+    print(f"\n🚀 Created fresh partition for run date {run_date_str}.")
 
     # --- 5. COMPUTE AND SAVE IN BATCHES ---
     print("\n🚀 Computing and saving results for all thresholds...")
@@ -70,7 +76,7 @@ def update_raw_points_for_run_date(run_date: datetime):
             t5_slice = t5_ds['rl_5.0'].sel(lat=lat_val).compute()
             t2_slice = t2_ds['rl_2.0'].sel(lat=lat_val).compute()
 
-            points_in_slice = 0
+            points_in_slice = []
             for lon_val in forecast_slice.lon.values:
                 forecast_value = forecast_slice.sel(lon=lon_val).item()
 
@@ -92,13 +98,17 @@ def update_raw_points_for_run_date(run_date: datetime):
                         lat=float(lat_val),
                         lon=float(lon_val),
                         forecast_value=float(forecast_value),
-                        return_period=return_period_found
+                        return_period=return_period_found,
+                        geohash=geohash_service.encode_geohash(
+                            float(lat_val), float(lon_val),
+                            GeohashClusteringService.POINT_GEOHASH_PRECISION
+                        )
                     )
-                    point.save()
-                    points_in_slice += 1
+                    points_in_slice.append(point)
             
-            if points_in_slice > 0:
-                points_saved_total += points_in_slice
+            if points_in_slice:
+                run_points.insert(points_in_slice, load_bulk=False)
+                points_saved_total += len(points_in_slice)
 
     print(f"\n🏁 Finished! Stored a total of {points_saved_total} alerts across all lead times.")
     client.close()
@@ -1,6 +1,9 @@
 import math
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 from schemas.significant_flood_point import SignificantFloodPoint, FloodCluster
+from services.compression_service import invalidate_published_payloads
+from services.partition_service import ForecastPartitionService
+from services.sketch_service import ForecastSketchService
 
 class GeohashClusteringService:
     """Service for clustering flood points using geohash-based approach"""
@@ -39,8 +42,13 @@ class GeohashClusteringService:
         'extreme': 1.0
     }
     
+    # Precision stored on every raw point, finer than any clustered zoom level
+    POINT_GEOHASH_PRECISION = 9
+
     def __init__(self):
         self.geohash_base32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+        self.partition_service = ForecastPartitionService()
+        self.sketch_service = ForecastSketchService()
     
     def encode_geohash(self, lat: float, lon: float, precision: int = 9) -> str:
         """Encode lat/lon to geohash string"""
@@ -109,6 +117,25 @@ class GeohashClusteringService:
         """Get geohash prefix for given zoom level"""
         precision = self.ZOOM_TO_PRECISION.get(zoom_level, 6)
         return self.encode_geohash(lat, lon, precision)
+
+    def is_valid_geohash(self, geohash: str) -> bool:
+        """Check that a string only uses the geohash base32 alphabet"""
+        return bool(geohash) and all(char in self.geohash_base32 for char in geohash)
+
+    def geohash_prefix_range(self, prefix: str) -> Tuple[str, str]:
+        """
+        Get the [lower, upper) string range holding every geohash that starts
+        with prefix. '~' sorts after every base32 character, so the range can
+        be answered by an index scan instead of a regex.
+        """
+        return prefix, prefix + '~'
+
+    def get_child_zoom_level(self, parent_geohash: str) -> Optional[int]:
+        """Get the first zoom level finer than the parent cell, or None at the finest level"""
+        for zoom_level, precision in sorted(self.ZOOM_TO_PRECISION.items()):
+            if precision > len(parent_geohash):
+                return zoom_level
+        return None
     
     def determine_risk_level(self, forecast_value: float) -> str:
         """Determine risk level based on forecast value"""
@@ -123,15 +150,17 @@ class GeohashClusteringService:
     
 # In the GeohashClusteringService class
     
-    def cluster_points_by_zoom(self, zoom_level: int, time: str = None) -> List[FloodCluster]:
-        """Cluster points for a specific zoom level and time (valid_for_date)."""
+    def cluster_points_by_zoom(self, zoom_level: int, time: str = None, run_dates: List[str] = None) -> List[FloodCluster]:
+        """
+        Cluster points for a specific zoom level and time (valid_for_date),
+        reading the given run partitions (default: the latest run of each date).
+        """
         query = {}
         # --- KEY CHANGE #1: Query by the new 'valid_for_date' field ---
         if time:
             query['valid_for_date'] = time
 
-        # Use the correct model (SignificantFloodPoint)
-        points = SignificantFloodPoint.objects(**query)
+        points = self.partition_service.iter_points(run_dates, **query)
         
         clusters = {}
         for point in points:
@@ -157,10 +186,8 @@ class GeohashClusteringService:
             center_lat, center_lon = sum(lats) / len(lats), sum(lons) / len(lons)
             avg_forecast, max_forecast, min_forecast = sum(forecast_values) / len(forecast_values), max(forecast_values), min(forecast_values)
             
-            return_periods = cluster_data['return_periods']
-            risk_level = 'low'
-            if '20-year' in return_periods: risk_level = 'high'
-            elif '5-year' in return_periods: risk_level = 'medium'
+            return_period_counts = self.sketch_service.count_return_periods(cluster_data['return_periods'])
+            histogram_bins, histogram_counts = self.sketch_service.build_histogram(forecast_values)
 
             cluster = FloodCluster(
                 zoom_level=zoom_level, geohash=geohash_prefix,
@@ -169,46 +196,116 @@ class GeohashClusteringService:
                 time=time, 
                 point_count=len(lats), avg_forecast=avg_forecast,
                 max_forecast=max_forecast, min_forecast=min_forecast,
-                risk_level=risk_level
+                risk_level=self.risk_level_for_return_periods(return_period_counts),
+                histogram_bins=histogram_bins, histogram_counts=histogram_counts,
+                return_period_counts=return_period_counts
             )
             flood_clusters.append(cluster)
         
         return flood_clusters
 
-    def get_sub_clusters(self, parent_geohash: str, parent_zoom_level: int, child_zoom_level: int, time: str = None) -> List[Dict]:
-        """Get sub-clusters within a parent cluster's bounds"""
-        # Get the bounds of the parent cluster
-        parent_bounds = self.decode_geohash_bounds(parent_geohash)
-        
-        # Generate clusters for the child zoom level within parent bounds
-        child_clusters = self.cluster_points_by_zoom(child_zoom_level, time, parent_geohash)
-        
-        # Convert to dictionary format
-        result = []
-        for cluster in child_clusters:
-            result.append({
-                'id': str(cluster.id) if hasattr(cluster, 'id') else f"{cluster.geohash}_{cluster.zoom_level}",
-                'zoom_level': cluster.zoom_level,
-                'geohash': cluster.geohash,
-                'lat': cluster.center_lat,
-                'lon': cluster.center_lon,
-                'time': cluster.time,
-                'point_count': cluster.point_count,
-                'avg_forecast': cluster.avg_forecast,
-                'max_forecast': cluster.max_forecast,
-                'min_forecast': cluster.min_forecast,
-                'risk_level': cluster.risk_level
-            })
-        
-        return result
+    def risk_level_for_return_periods(self, return_period_counts: Dict[str, int]) -> str:
+        """A cluster takes the risk level of its most severe return period"""
+        if return_period_counts.get('20-year'):
+            return 'high'
+        if return_period_counts.get('5-year'):
+            return 'medium'
+        return 'low'
+
+    def merge_child_clusters(self, zoom_level: int, child_clusters: List[FloodCluster]) -> List[FloodCluster]:
+        """
+        Build the clusters of a coarser zoom level by merging the clusters of a
+        finer one. Counts, weighted means, extremes and sketches all merge
+        exactly, so the result equals clustering the raw points again.
+        """
+        precision = self.ZOOM_TO_PRECISION[zoom_level]
+        groups = {}
+        for child in child_clusters:
+            groups.setdefault(child.geohash[:precision], []).append(child)
+
+        flood_clusters = []
+        for geohash_prefix, children in groups.items():
+            point_count = sum(child.point_count for child in children)
+            return_period_counts = self.sketch_service.merge_return_period_counts(
+                child.return_period_counts for child in children
+            )
+            histogram_bins, histogram_counts = self.sketch_service.merge_histograms(
+                (child.histogram_bins, child.histogram_counts) for child in children
+            )
+
+            flood_clusters.append(FloodCluster(
+                zoom_level=zoom_level, geohash=geohash_prefix,
+                center_lat=sum(child.center_lat * child.point_count for child in children) / point_count,
+                center_lon=sum(child.center_lon * child.point_count for child in children) / point_count,
+                time=children[0].time,
+                point_count=point_count,
+                avg_forecast=sum(child.avg_forecast * child.point_count for child in children) / point_count,
+                max_forecast=max(child.max_forecast for child in children),
+                min_forecast=min(child.min_forecast for child in children),
+                risk_level=self.risk_level_for_return_periods(return_period_counts),
+                histogram_bins=histogram_bins, histogram_counts=histogram_counts,
+                return_period_counts=return_period_counts
+            ))
+
+        return flood_clusters
 
-    def generate_all_zoom_clusters(self, time: str = None):
+    def get_sub_clusters(self, parent_geohash: str, time: str, snapshot=None) -> Dict:
         """
-        Generates clusters for all zoom levels. If a time is specified, it runs for that
-        day only. If no time is specified, it finds all unique dates in the data
-        and generates clusters for each of them.
+        Get the contents of a parent cluster one zoom level down. Returns the
+        stored clusters of the next zoom level inside the parent cell, or the
+        raw points when the parent is already at the finest clustered level.
+        Both lookups are geohash prefix range queries on an index; raw points
+        are read from the date's mapped snapshot instead when one is given.
+        Snapshot points have no database id, so raw points carry no id from
+        either source.
+        """
+        lower, upper = self.geohash_prefix_range(parent_geohash)
+        child_zoom_level = self.get_child_zoom_level(parent_geohash)
+
+        if child_zoom_level is not None:
+            clusters = self.partition_service.iter_clusters(
+                time, zoom_level=child_zoom_level,
+                geohash__gte=lower, geohash__lt=upper
+            )
+            return {
+                'parent_geohash': parent_geohash,
+                'zoom_level': child_zoom_level,
+                'clusters': [self.cluster_to_dict(cluster) for cluster in clusters]
+            }
+
+        if snapshot is not None:
+            points = []
+            for _, point in snapshot.points_in_geohash(parent_geohash):
+                point['time'] = time
+                points.append(point)
+            return {'parent_geohash': parent_geohash, 'zoom_level': None, 'points': points}
+
+        points = []
+        for point in self.partition_service.iter_points(
+            valid_for_date=time, geohash__gte=lower, geohash__lt=upper
+        ):
+            point = self.point_to_dict(point)
+            del point['id']
+            points.append(point)
+        return {'parent_geohash': parent_geohash, 'zoom_level': None, 'points': points}
+
+    def generate_all_zoom_clusters(self, time: str = None, run_date: str = None):
+        """
+        Generates clusters for all zoom levels for the dates of run_date
+        (default: the newest run). If a time is specified, it runs for that
+        day only. If no time is specified, it finds all unique dates of the run
+        and generates clusters for each of them. Each date is clustered from,
+        and written into, the run that holds its most recent forecast: run_date
+        itself when it has points for the date, otherwise the date's latest run.
         """
         print("--- Starting Cluster Generation ---")
+
+        retained_run_dates = self.partition_service.retained_run_dates()
+        if not retained_run_dates:
+            print("No forecast runs found. Skipping.")
+            return
+        run_date = run_date or retained_run_dates[0]
+        print(f"Generating clusters for run date: {run_date}")
         
         # Clear all existing clusters before starting
         # FloodCluster.objects.delete()
@@ -220,30 +317,51 @@ class GeohashClusteringService:
             print(f"Targeting single date: {time}")
         else:
             print("Finding all unique dates in the source data...")
-            # This fetches every unique 'time' value from your raw data
-            dates_to_process = SignificantFloodPoint.objects.distinct('time')
+            # This fetches every unique 'valid_for_date' value from the run's raw data
+            dates_to_process = self.partition_service.points(run_date).distinct('valid_for_date')
             print(f"✅ Found {len(dates_to_process)} unique dates to process.")
 
         # Loop through each date and generate clusters for it
+        written_run_dates = set()
         for process_date in dates_to_process:
             print(f"\n--- Processing date: {process_date} ---")
+
+            # Only the most recent forecast of the date is clustered, never a superseded run
+            source_run_date = self.partition_service.source_run_date(process_date, run_date)
+            if source_run_date is None:
+                print(f"No points found for {process_date}. Skipping.")
+                continue
+            if source_run_date != run_date:
+                print(f"   {run_date} has no points for {process_date}, writing into run {source_run_date}")
+
+            # Regenerating a date replaces its clusters in the partition reads are routed to
+            run_clusters = self.partition_service.clusters(source_run_date)
+            run_clusters(time=process_date).delete()
+            written_run_dates.add(source_run_date)
+
+            # Only the finest zoom level reads the raw points for this specific date
+            zoom_levels = sorted(self.ZOOM_TO_PRECISION.keys())
+            print(f"   Processing zoom level {zoom_levels[-1]} for {process_date}...")
+            clusters_for_zoom = self.cluster_points_by_zoom(zoom_levels[-1], time=process_date, run_dates=[source_run_date])
             
-            # Start with zoom level 0 for this specific date
-            clusters_for_date = self.cluster_points_by_zoom(0, time=process_date)
-            
-            if not clusters_for_date:
+            if not clusters_for_zoom:
                 print(f"No points found for {process_date}. Skipping.")
                 continue
 
-            # Hierarchically generate clusters for other zoom levels for this date
-            # (This part of your logic was specific to a single run, so we'll simplify)
-            for zoom_level in sorted(self.ZOOM_TO_PRECISION.keys()):
-                 print(f"   Processing zoom level {zoom_level} for {process_date}...")
-                 clusters_for_zoom = self.cluster_points_by_zoom(zoom_level, time=process_date)
+            # Hierarchically build each coarser zoom level by merging its children
+            for zoom_level in reversed(zoom_levels):
+                 if zoom_level != zoom_levels[-1]:
+                     print(f"   Processing zoom level {zoom_level} for {process_date}...")
+                     clusters_for_zoom = self.merge_child_clusters(zoom_level, clusters_for_zoom)
                  
-                 if clusters_for_zoom:
-                     FloodCluster.objects.insert(clusters_for_zoom)
-                     print(f"   ✅ Created {len(clusters_for_zoom)} clusters for zoom {zoom_level}")
+                 run_clusters.insert(clusters_for_zoom, load_bulk=False)
+                 print(f"   ✅ Created {len(clusters_for_zoom)} clusters for zoom {zoom_level}")
+
+        # Let reads route the regenerated dates to the partitions that now hold them
+        for written_run_date in written_run_dates:
+            self.partition_service.refresh_partition(written_run_date)
+        # Whole-day payloads published from the old clusters would otherwise keep being served
+        invalidate_published_payloads(dates_to_process, summary=False)
 
         # print("\n🏁 Hierarchical cluster generation complete for all dates!")
 
@@ -310,8 +428,6 @@ class GeohashClusteringService:
         """Get clusters for a specific viewport and zoom level"""
         # Build query
         query = {'zoom_level': zoom_level}
-        if time:
-            query['time'] = time
         
         # Add bounding box filter if provided
         if bounds:
@@ -320,23 +436,148 @@ class GeohashClusteringService:
             query['center_lon__gte'] = bounds['west']
             query['center_lon__lte'] = bounds['east']
         
-        clusters = FloodCluster.objects(**query)
+        clusters = self.partition_service.iter_clusters(time, **query)
         
-        # Convert to dictionary format
-        result = []
+        return [self.cluster_to_dict(cluster) for cluster in clusters]
+
+    def get_distribution_for_viewport(self, bounds: Dict, time: str, quantiles: List[float],
+                                      zoom_level: int = None) -> Dict:
+        """
+        Answer quantile and histogram questions for a viewport by merging the
+        sketches stored on its clusters, without reading any raw points. The
+        finest zoom level is used by default since its cells follow the
+        viewport edges most closely.
+        """
+        if zoom_level is None:
+            zoom_level = max(self.ZOOM_TO_PRECISION.keys())
+
+        query = {'zoom_level': zoom_level}
+        if bounds:
+            query['center_lat__gte'] = bounds['south']
+            query['center_lat__lte'] = bounds['north']
+            query['center_lon__gte'] = bounds['west']
+            query['center_lon__lte'] = bounds['east']
+
+        clusters = list(self.partition_service.iter_clusters(
+            time,
+            only=['point_count', 'min_forecast', 'max_forecast',
+                  'histogram_bins', 'histogram_counts', 'return_period_counts'],
+            **query
+        ))
+
+        histogram_bins, histogram_counts = self.sketch_service.merge_histograms(
+            (cluster.histogram_bins, cluster.histogram_counts) for cluster in clusters
+        )
+        min_forecast = min((cluster.min_forecast for cluster in clusters), default=None)
+        max_forecast = max((cluster.max_forecast for cluster in clusters), default=None)
+
+        return {
+            'time': time,
+            'zoom_level': zoom_level,
+            'cluster_count': len(clusters),
+            'point_count': sum(cluster.point_count for cluster in clusters),
+            'min_forecast': min_forecast,
+            'max_forecast': max_forecast,
+            'return_period_counts': self.sketch_service.merge_return_period_counts(
+                cluster.return_period_counts for cluster in clusters
+            ),
+            'quantiles': {
+                str(q): value for q, value in self.sketch_service.quantiles(
+                    histogram_bins, histogram_counts, quantiles, min_forecast, max_forecast
+                ).items()
+            },
+            'histogram': {
+                'edges': self.sketch_service.bin_edges(),
+                'counts': self.sketch_service.dense_counts(histogram_bins, histogram_counts)
+            }
+        }
+
+    def get_batch_clusters_for_viewport(self, zoom_levels: List[int], bounds: Dict, times: List[str]) -> Dict:
+        """
+        Get clusters for several dates (and zoom levels) of one viewport in a
+        single query per run partition, normally one. Each cluster cell is
+        returned once, positioned at its geohash cell center, with one value
+        per requested date in each column (None where the date has no cluster).
+        Cells are selected by their cell center, not by each date's centroid,
+        so a cell is either in the viewport for every date or for none.
+        """
+        query = {'zoom_level__in': zoom_levels}
+        if bounds:
+            # A centroid lies inside its cell, so it is at most half a cell
+            # away from the cell center; widen by the coarsest requested cell
+            widest_cell = self.decode_geohash_bounds('0' * min(self.ZOOM_TO_PRECISION.get(zoom, 6) for zoom in zoom_levels))
+            lat_margin = (widest_cell['north'] - widest_cell['south']) / 2
+            lon_margin = (widest_cell['east'] - widest_cell['west']) / 2
+            query['center_lat__gte'] = bounds['south'] - lat_margin
+            query['center_lat__lte'] = bounds['north'] + lat_margin
+            query['center_lon__gte'] = bounds['west'] - lon_margin
+            query['center_lon__lte'] = bounds['east'] + lon_margin
+
+        clusters = self.partition_service.iter_clusters(
+            times=times,
+            only=['zoom_level', 'geohash', 'time', 'point_count', 'avg_forecast',
+                  'max_forecast', 'min_forecast', 'risk_level'],
+            **query
+        )
+
+        columns = ['point_count', 'avg_forecast', 'max_forecast', 'min_forecast', 'risk_level']
+        date_index = {time: index for index, time in enumerate(times)}
+        cells = {}
         for cluster in clusters:
-            result.append({
-                'id': str(cluster.id),
-                'zoom_level': cluster.zoom_level,
-                'geohash': cluster.geohash,
-                'lat': cluster.center_lat,
-                'lon': cluster.center_lon,
-                'time': cluster.time,
-                'point_count': cluster.point_count,
-                'avg_forecast': cluster.avg_forecast,
-                'max_forecast': cluster.max_forecast,
-                'min_forecast': cluster.min_forecast,
-                'risk_level': cluster.risk_level
-            })
-        
-        return result 
\ No newline at end of file
+            key = (cluster.zoom_level, cluster.geohash)
+            if key not in cells:
+                cell_bounds = self.decode_geohash_bounds(cluster.geohash)
+                cells[key] = {
+                    'zoom_level': cluster.zoom_level,
+                    'geohash': cluster.geohash,
+                    'lat': (cell_bounds['south'] + cell_bounds['north']) / 2,
+                    'lon': (cell_bounds['west'] + cell_bounds['east']) / 2,
+                }
+                for column in columns:
+                    cells[key][column] = [None] * len(times)
+
+            index = date_index[cluster.time]
+            for column in columns:
+                cells[key][column][index] = getattr(cluster, column)
+
+        if bounds:
+            cells = {
+                key: cell for key, cell in cells.items()
+                if bounds['south'] <= cell['lat'] <= bounds['north']
+                and bounds['west'] <= cell['lon'] <= bounds['east']
+            }
+
+        return {
+            'dates': times,
+            'zoom_levels': zoom_levels,
+            'clusters': [cells[key] for key in sorted(cells)]
+        }
+
+    @staticmethod
+    def cluster_to_dict(cluster: FloodCluster) -> Dict:
+        """Convert a FloodCluster into the API response format"""
+        return {
+            'id': str(cluster.id),
+            'zoom_level': cluster.zoom_level,
+            'geohash': cluster.geohash,
+            'lat': cluster.center_lat,
+            'lon': cluster.center_lon,
+            'time': cluster.time,
+            'point_count': cluster.point_count,
+            'avg_forecast': cluster.avg_forecast,
+            'max_forecast': cluster.max_forecast,
+            'min_forecast': cluster.min_forecast,
+            'risk_level': cluster.risk_level
+        }
+
+    @staticmethod
+    def point_to_dict(point: SignificantFloodPoint) -> Dict:
+        """Convert a SignificantFloodPoint into the API response format"""
+        return {
+            'id': str(point.id),
+            'time': point.valid_for_date,
+            'lat': point.lat,
+            'lon': point.lon,
+            'forecast_value': point.forecast_value,
+            'return_period': point.return_period
+        }
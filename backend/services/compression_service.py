@@ -0,0 +1,241 @@
+import gzip
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from config.compression import (
+    ZSTD_LEVEL, BROTLI_LEVEL, GZIP_LEVEL,
+    PUBLISH_ZSTD_LEVEL, PUBLISH_BROTLI_LEVEL, PUBLISH_GZIP_LEVEL,
+    COMPRESSION_MINIMUM_SIZE
+)
+from schemas.published_payload import PublishedPayload
+
+# zstd and brotli are optional, gzip from the standard library always works
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Mongo rejects documents over 16MB and every encoding of a payload shares one
+# document, so this caps their combined size, leaving room for the other fields
+MAX_PUBLISHED_SIZE = 15 * 1024 * 1024
+
+# Content types that are streamed and must never be buffered
+STREAMING_MEDIA_TYPES = ('text/event-stream',)
+
+RESPONSE_LEVELS = {'zstd': ZSTD_LEVEL, 'br': BROTLI_LEVEL, 'gzip': GZIP_LEVEL}
+PUBLISH_LEVELS = {'zstd': PUBLISH_ZSTD_LEVEL, 'br': PUBLISH_BROTLI_LEVEL, 'gzip': PUBLISH_GZIP_LEVEL}
+
+
+def available_encodings() -> List[str]:
+    """Get the supported content encodings, most preferred first"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    """Compress data with the given content encoding"""
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def acceptable_encodings(accept_encoding: str, offered: List[str]) -> List[str]:
+    """
+    Get the offered encodings an Accept-Encoding header accepts, best first.
+    Higher q-values win; ties go to the order of offered.
+    """
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+
+    ranked = [(accepted.get(encoding, accepted.get('*', 0.0)), position, encoding)
+              for position, encoding in enumerate(offered)]
+    return [encoding for q, position, encoding in sorted(ranked, key=lambda item: (-item[0], item[1])) if q > 0]
+
+
+def negotiate_encoding(accept_encoding: str, offered: List[str]) -> Optional[str]:
+    """
+    Pick the encoding to respond with from an Accept-Encoding header, or
+    None when the client accepts none of the offered ones.
+    """
+    encodings = acceptable_encodings(accept_encoding, offered)
+    return encodings[0] if encodings else None
+
+
+def render_json(content) -> bytes:
+    """Render JSON exactly like FastAPI's JSONResponse does"""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+SUMMARY_PAYLOAD_KEY = "summary"
+
+
+def cluster_payload_prefix(date: str) -> str:
+    return f"clusters:{date}:"
+
+
+def cluster_payload_key(date: str, zoom_level: int) -> str:
+    """Get the key of a whole-day cluster payload"""
+    return f"{cluster_payload_prefix(date)}{zoom_level}"
+
+
+def publish_payload(key: str, content) -> Dict[str, int]:
+    """
+    Render a cacheable payload and store it compressed with every available
+    encoding, so requests can be served without any compression work.
+    Returns the stored size of each encoding.
+    """
+    body = render_json(content)
+    encoded = {encoding: compress(body, encoding, PUBLISH_LEVELS[encoding]) for encoding in available_encodings()}
+    # Drop the largest encodings until the rest fit; clients that accept none of
+    # them get the response built and compressed per request instead
+    while encoded and sum(len(data) for data in encoded.values()) > MAX_PUBLISHED_SIZE:
+        del encoded[max(encoded, key=lambda encoding: len(encoded[encoding]))]
+
+    PublishedPayload.objects(key=key).update_one(
+        set__media_type="application/json",
+        set__zstd=encoded.get('zstd'),
+        set__br=encoded.get('br'),
+        set__gzip=encoded.get('gzip'),
+        set__published_at=datetime.now(timezone.utc),
+        upsert=True
+    )
+    return {encoding: len(data) for encoding, data in encoded.items()}
+
+
+def get_published_response(key: str, accept_encoding: str) -> Optional[Response]:
+    """
+    Get a published payload as a ready-to-send response in the best encoding
+    the client accepts, or None so the caller builds the response itself.
+    """
+    # Each encoding is up to MAX_PUBLISHED_SIZE, so only the one that is sent is loaded.
+    # One is missing only when it was too large or its library wasn't installed
+    for encoding in acceptable_encodings(accept_encoding, ['zstd', 'br', 'gzip']):
+        payload = PublishedPayload.objects(key=key).only('media_type', encoding).as_pymongo().first()
+        if payload is None:
+            return None
+        if payload.get(encoding):
+            return Response(
+                content=payload[encoding],
+                media_type=payload['media_type'],
+                headers={'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'}
+            )
+    return None
+
+
+def invalidate_published_payloads(dates: List[str], summary: bool = True):
+    """
+    Delete the published payloads built from the given dates' data (and the
+    summary, built from every date's points), so requests fall back to the
+    database until the next pipeline run publishes them again.
+    """
+    for date in dates:
+        PublishedPayload.objects(key__startswith=cluster_payload_prefix(date)).delete()
+    if summary:
+        PublishedPayload.objects(key=SUMMARY_PAYLOAD_KEY).delete()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses responses with zstd, brotli or gzip,
+    whichever the client prefers. Responses that already carry a
+    Content-Encoding (e.g. published payloads) and streamed responses are
+    passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get('accept-encoding', '')
+        encoding = negotiate_encoding(accept_encoding, available_encodings())
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+    """Buffers one response and sends it compressed"""
+
+    def __init__(self, app, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.passthrough = False
+        self.body_parts = []
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message):
+        if message['type'] == 'http.response.start':
+            headers = Headers(raw=message['headers'])
+            self.passthrough = (
+                'content-encoding' in headers
+                or headers.get('content-type', '').startswith(STREAMING_MEDIA_TYPES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start_message = message
+            return
+
+        if self.passthrough or message['type'] != 'http.response.body':
+            await self.send(message)
+            return
+
+        self.body_parts.append(message.get('body', b''))
+        if message.get('more_body', False):
+            return
+
+        body = b''.join(self.body_parts)
+        headers = MutableHeaders(raw=self.start_message['headers'])
+        if len(body) >= self.minimum_size:
+            body = compress(body, self.encoding, RESPONSE_LEVELS[self.encoding])
+            headers['Content-Encoding'] = self.encoding
+            headers['Content-Length'] = str(len(body))
+            headers.add_vary_header('Accept-Encoding')
+
+        await self.send(self.start_message)
+        await self.send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,121 @@
+from typing import Dict, List, Optional, Tuple
+from schemas.significant_flood_point import FloodPointDelta
+from services.partition_service import ForecastPartitionService
+
+class FloodDeltaService:
+    """Service for computing and serving point changes between forecast runs"""
+
+    # Rows per stored delta document, keeps each document far below Mongo's 16MB limit
+    CHUNK_SIZE = 20000
+
+    def __init__(self):
+        self.partition_service = ForecastPartitionService()
+
+    def get_previous_run_date(self, run_date: str) -> Optional[str]:
+        """Get the most recent active forecast_run_date before run_date, if any"""
+        run_dates = [date for date in self.partition_service.active_run_dates() if date < run_date]
+        return max(run_dates) if run_dates else None
+
+    def load_run_points(self, run_date: str, valid_for_date: str) -> Dict[Tuple[float, float], Tuple[float, str]]:
+        """Load one run's points for a date, keyed by grid cell (lat, lon)"""
+        points = self.partition_service.points(run_date)(
+            valid_for_date=valid_for_date
+        ).only('lat', 'lon', 'forecast_value', 'return_period').as_pymongo()
+
+        return {
+            (point['lat'], point['lon']): (point['forecast_value'], point['return_period'])
+            for point in points
+        }
+
+    def diff_points(self, previous: Dict, current: Dict) -> Dict[str, List[List]]:
+        """Compare two keyed point sets and return the added, changed and removed rows"""
+        added, changed = [], []
+        for (lat, lon), (forecast_value, return_period) in current.items():
+            previous_point = previous.get((lat, lon))
+            if previous_point is None:
+                added.append([lat, lon, forecast_value, return_period])
+            elif previous_point != (forecast_value, return_period):
+                changed.append([lat, lon, forecast_value, return_period])
+
+        removed = [[lat, lon] for (lat, lon) in previous if (lat, lon) not in current]
+        return {'added': added, 'changed': changed, 'removed': removed}
+
+    def compute_run_deltas(self, run_date: str) -> List[str]:
+        """
+        Compute and store, for every valid_for_date of run_date, the points
+        that were added, changed or removed since the previous run. Returns
+        the valid_for_dates that have at least one change (all of them when
+        there is no previous run).
+        """
+        base_run_date = self.get_previous_run_date(run_date)
+        FloodPointDelta.objects(forecast_run_date=run_date).delete()
+        valid_for_dates = self.partition_service.points(run_date).distinct('valid_for_date')
+
+        if base_run_date is None:
+            print(f"No previous run before {run_date}, skipping delta computation.")
+            return sorted(valid_for_dates)
+
+        changed_dates = []
+        for valid_for_date in sorted(valid_for_dates):
+            delta = self.diff_points(
+                self.load_run_points(base_run_date, valid_for_date),
+                self.load_run_points(run_date, valid_for_date)
+            )
+
+            # An empty delta is still stored so clients can tell "unchanged" from "unknown"
+            documents = []
+            rows = max(len(delta['added']), len(delta['changed']), len(delta['removed']))
+            for chunk, start in enumerate(range(0, max(rows, 1), self.CHUNK_SIZE)):
+                end = start + self.CHUNK_SIZE
+                documents.append(FloodPointDelta(
+                    forecast_run_date=run_date, base_run_date=base_run_date,
+                    valid_for_date=valid_for_date, chunk=chunk,
+                    added=delta['added'][start:end],
+                    changed=delta['changed'][start:end],
+                    removed=delta['removed'][start:end]
+                ))
+
+            FloodPointDelta.objects.insert(documents)
+            if rows:
+                changed_dates.append(valid_for_date)
+            print(f"   ✅ Delta for {valid_for_date}: {len(delta['added'])} added, "
+                  f"{len(delta['changed'])} changed, {len(delta['removed'])} removed")
+
+        return changed_dates
+
+    def get_deltas_since(self, since_run: str, valid_for_date: str = None) -> Optional[List[Dict]]:
+        """
+        Get every stored delta needed to bring a client holding since_run up
+        to date, in the order they must be applied. Returns None when no delta
+        starts at since_run, meaning the client has to do a full reload.
+        Only deltas leading to active runs are returned: a run still building
+        (or left behind by a failed pipeline) is not served, and its deltas
+        would fork the chain.
+        """
+        query = {
+            'base_run_date__gte': since_run,
+            'forecast_run_date__in': self.partition_service.active_run_dates()
+        }
+        if valid_for_date:
+            query['valid_for_date'] = valid_for_date
+
+        documents = FloodPointDelta.objects(**query).order_by('forecast_run_date', 'valid_for_date', 'chunk')
+
+        deltas = {}
+        for document in documents:
+            key = (document.forecast_run_date, document.valid_for_date)
+            if key not in deltas:
+                deltas[key] = {
+                    'forecast_run_date': document.forecast_run_date,
+                    'base_run_date': document.base_run_date,
+                    'valid_for_date': document.valid_for_date,
+                    'added': [], 'changed': [], 'removed': []
+                }
+            deltas[key]['added'].extend(document.added)
+            deltas[key]['changed'].extend(document.changed)
+            deltas[key]['removed'].extend(document.removed)
+
+        if not any(delta['base_run_date'] == since_run for delta in deltas.values()):
+            return None
+
+        return list(deltas.values())
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from pymongo import CursorType
+
+from schemas.data_version_event import DataVersionEvent
+
+def event_to_dict(event: Dict) -> Dict:
+    """Convert a raw data_version_events document into the event payload"""
+    return {
+        'id': str(event['_id']),
+        'version': event['version'],
+        'forecast_run_date': event['forecast_run_date'],
+        'available_dates': event.get('available_dates', []),
+        'changed_dates': event.get('changed_dates', []),
+    }
+
+def format_sse(event: Dict) -> str:
+    """Format an event payload as one server-sent event"""
+    return f"id: {event['id']}\nevent: data-version\ndata: {json.dumps(event)}\n\n"
+
+def publish_data_version(forecast_run_date: str, available_dates: List[str], changed_dates: List[str]) -> DataVersionEvent:
+    """Announce that a pipeline run has committed a new version of the data"""
+    published_at = datetime.now(timezone.utc)
+    event = DataVersionEvent(
+        version=published_at.strftime("%Y%m%dT%H%M%S%fZ"),
+        forecast_run_date=forecast_run_date,
+        available_dates=available_dates,
+        changed_dates=changed_dates,
+        published_at=published_at
+    )
+    event.save()
+    return event
+
+def get_latest_event() -> Optional[Dict]:
+    """Get the most recent data version event, if any"""
+    event = DataVersionEvent.objects.order_by('-id').as_pymongo().first()
+    return event_to_dict(event) if event else None
+
+
+class DataVersionBroadcaster:
+    """
+    Per-process fan-out of data version events. One background thread tails
+    the capped data_version_events collection and hands each new event to
+    every connected SSE client, so clients never poll the API or the DB.
+    """
+
+    # How long to wait before re-opening the tailable cursor once it dies
+    RETRY_SECONDS = 1.0
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register the calling event loop's client and start tailing if needed"""
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._tail, name="data-version-tail", daemon=True)
+                self._thread.start()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def _dispatch(self, event: Dict):
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def _tail(self):
+        collection = DataVersionEvent._get_collection()
+        latest = collection.find_one(sort=[('_id', -1)])
+        last_id = latest['_id'] if latest else None
+
+        while True:
+            try:
+                query = {'_id': {'$gt': last_id}} if last_id else {}
+                cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while True:
+                    for event in cursor:
+                        last_id = event['_id']
+                        self._dispatch(event_to_dict(event))
+                    if not cursor.alive:
+                        break
+            except Exception as e:
+                print(f"Data version tail failed, retrying: {e}")
+            time.sleep(self.RETRY_SECONDS)
+
+
+# Shared by every SSE client in this worker; the thread starts with the first client
+broadcaster = DataVersionBroadcaster()
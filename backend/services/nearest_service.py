@@ -0,0 +1,119 @@
+import math
+import threading
+import time as timer
+from typing import Dict, Optional
+
+from services.snapshot_service import FloodSnapshot
+
+class NearestPointService:
+    """
+    Service for k-nearest-point queries around a location. Each date's
+    points are indexed in a KD-tree over unit-sphere (x, y, z) coordinates,
+    where straight-line (chord) distance orders points exactly like
+    great-circle distance. Trees are built from the mapped snapshot on first
+    use and rebuilt only when the pipeline renames a new snapshot into place.
+    """
+
+    EARTH_RADIUS_KM = 6371.0088
+
+    # Trees kept per worker; a run serves 3 dates and two runs are retained
+    MAX_TREES = 8
+
+    def __init__(self):
+        # valid_for_date -> (snapshot file id, tree), oldest built first
+        self._trees = {}
+        # Requests run in the threadpool; concurrent first requests build a tree once
+        self._build_lock = threading.Lock()
+
+    @staticmethod
+    def to_unit_vectors(lats, lons):
+        """Convert degree coordinate arrays into an (n, 3) array of unit vectors"""
+        # numpy is imported here, not at module level, to keep API cold starts light
+        import numpy as np
+
+        lat_radians = np.radians(lats)
+        lon_radians = np.radians(lons)
+        cos_lat = np.cos(lat_radians)
+        return np.column_stack((cos_lat * np.cos(lon_radians), cos_lat * np.sin(lon_radians), np.sin(lat_radians)))
+
+    def chord_to_km(self, chord: float) -> float:
+        return 2 * self.EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+    def km_to_chord(self, km: float) -> float:
+        return 2 * math.sin(min(math.pi, km / self.EARTH_RADIUS_KM) / 2)
+
+    def get_tree(self, snapshot: FloodSnapshot):
+        """Get the KD-tree of a snapshot, building it once per snapshot file"""
+        cached = self._trees.get(snapshot.valid_for_date)
+        if cached is not None and cached[0] == snapshot.file_id:
+            return cached[1]
+
+        with self._build_lock:
+            cached = self._trees.get(snapshot.valid_for_date)
+            if cached is not None and cached[0] == snapshot.file_id:
+                return cached[1]
+            return self._build_tree(snapshot)
+
+    def _build_tree(self, snapshot: FloodSnapshot):
+        import numpy as np
+        from scipy.spatial import cKDTree
+
+        # The columns are read straight from the mapped file, without copying into lists
+        lats = np.frombuffer(snapshot.lat, dtype=np.float64)
+        lons = np.frombuffer(snapshot.lon, dtype=np.float64)
+        tree = cKDTree(self.to_unit_vectors(lats, lons))
+
+        self._trees.pop(snapshot.valid_for_date, None)
+        self._trees[snapshot.valid_for_date] = (snapshot.file_id, tree)
+        while len(self._trees) > self.MAX_TREES:
+            del self._trees[next(iter(self._trees))]
+        return tree
+
+    def find_nearest(self, snapshot: FloodSnapshot, lat: float, lon: float, k: int,
+                     max_km: Optional[float] = None) -> Dict:
+        """
+        Get the k points nearest to (lat, lon), closest first, with
+        great-circle distances. Ids are "<date>:<index>" positions in the
+        snapshot, not database ids.
+        """
+        start_time = timer.perf_counter()
+        points = []
+
+        if len(snapshot):
+            tree = self.get_tree(snapshot)
+            upper_bound = self.km_to_chord(max_km) if max_km is not None else float('inf')
+            chords, indexes = tree.query(
+                self.to_unit_vectors([lat], [lon])[0],
+                k=min(k, len(snapshot)),
+                distance_upper_bound=upper_bound
+            )
+
+            # A single neighbour comes back as scalars rather than arrays
+            chords = chords.tolist() if hasattr(chords, 'tolist') else chords
+            indexes = indexes.tolist() if hasattr(indexes, 'tolist') else indexes
+            if not isinstance(chords, list):
+                chords, indexes = [chords], [indexes]
+
+            for chord, index in zip(chords, indexes):
+                # Missing neighbours beyond max_km are reported as index == len(snapshot)
+                if index >= len(snapshot):
+                    continue
+                point = snapshot.point(index)
+                point.update({
+                    'id': f"{snapshot.valid_for_date}:{index}",
+                    'time': snapshot.valid_for_date,
+                    'distance_km': self.chord_to_km(chord)
+                })
+                points.append(point)
+
+        return {
+            'lat': lat,
+            'lon': lon,
+            'time': snapshot.valid_for_date,
+            'points': points,
+            'took_ms': (timer.perf_counter() - start_time) * 1000
+        }
+
+
+# Shared by every request in this worker; trees are built lazily on first use
+nearest_service = NearestPointService()
@@ -0,0 +1,286 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from mongoengine.connection import get_db
+from mongoengine.queryset import QuerySet
+
+from schemas.forecast_partition import ForecastPartition
+from schemas.latest_forecast_run import LatestForecastRun
+from services.compression_service import invalidate_published_payloads
+from schemas.significant_flood_point import SignificantFloodPoint, FloodCluster, FloodPointDelta
+
+class ForecastPartitionService:
+    """
+    Service for the per-run partitions of points and clusters. Every
+    forecast_run_date gets its own pair of collections plus a registry
+    document; reads fan out over the active partitions and retention drops
+    whole collections instead of deleting documents one by one. Point
+    reads only touch the latest run of each valid_for_date, which the
+    LatestForecastRun pointers record.
+    """
+
+    POINTS_COLLECTION_PREFIX = 'significant_flood_points'
+    CLUSTERS_COLLECTION_PREFIX = 'flood_clusters'
+
+    def collection_name(self, prefix: str, run_date: str) -> str:
+        """Get the collection name of one run's partition, e.g. flood_clusters_20250626"""
+        return f"{prefix}_{run_date.replace('-', '')}"
+
+    def _queryset(self, document, collection_name: str) -> QuerySet:
+        return QuerySet(document, get_db()[collection_name])
+
+    def points(self, run_date: str) -> QuerySet:
+        """Get a queryset over one run's points"""
+        return self._queryset(SignificantFloodPoint, self.collection_name(self.POINTS_COLLECTION_PREFIX, run_date))
+
+    def clusters(self, run_date: str) -> QuerySet:
+        """Get a queryset over one run's clusters"""
+        return self._queryset(FloodCluster, self.collection_name(self.CLUSTERS_COLLECTION_PREFIX, run_date))
+
+    def _ensure_indexes(self, document, collection_name: str):
+        # The indexes are declared once, in the document's meta
+        collection = get_db()[collection_name]
+        for spec in document._meta['index_specs']:
+            options = {key: value for key, value in spec.items() if key != 'fields'}
+            collection.create_index(spec['fields'], **options)
+
+    def create_partition(self, run_date: str) -> ForecastPartition:
+        """
+        Create an empty 'building' partition for a run, replacing any earlier
+        partition of the same run. Building partitions are invisible to reads.
+        The version continues from the replaced partition, so its snapshots
+        never match the new contents.
+        """
+        version = self.partition_version(run_date)
+        self.drop_partition(run_date)
+
+        partition = ForecastPartition(
+            forecast_run_date=run_date,
+            points_collection=self.collection_name(self.POINTS_COLLECTION_PREFIX, run_date),
+            clusters_collection=self.collection_name(self.CLUSTERS_COLLECTION_PREFIX, run_date),
+            status='building',
+            created_at=datetime.now(timezone.utc),
+            version=version
+        )
+        self._ensure_indexes(SignificantFloodPoint, partition.points_collection)
+        self._ensure_indexes(FloodCluster, partition.clusters_collection)
+        partition.save()
+        return partition
+
+    def get_or_create_partition(self, run_date: str) -> ForecastPartition:
+        partition = ForecastPartition.objects(forecast_run_date=run_date).first()
+        return partition or self.create_partition(run_date)
+
+    def refresh_partition(self, run_date: str, **updates):
+        """Record which dates a partition holds points and clusters for"""
+        ForecastPartition.objects(forecast_run_date=run_date).update_one(
+            set__valid_for_dates=sorted(self.points(run_date).distinct('valid_for_date')),
+            set__cluster_dates=sorted(self.clusters(run_date).distinct('time')),
+            **updates
+        )
+
+    def activate_partition(self, run_date: str):
+        """
+        Make a finished partition visible to reads. Every activation bumps the
+        partition's version, including re-activations after points were
+        appended, so snapshots built from earlier contents stop being served.
+        """
+        self.refresh_partition(
+            run_date, set__status='active', inc__version=1, set__activated_at=datetime.now(timezone.utc)
+        )
+        self.refresh_latest_runs()
+
+        # Published payloads of the run's dates were built from the runs it supersedes
+        partition = ForecastPartition.objects(forecast_run_date=run_date).first()
+        invalidate_published_payloads(partition.valid_for_dates)
+
+    def drop_partition(self, run_date: str):
+        """Drop a run's collections and registry entry, O(1) regardless of size"""
+        # Repoint reads away from the run before its collections disappear
+        partition = ForecastPartition.objects(forecast_run_date=run_date).first()
+        ForecastPartition.objects(forecast_run_date=run_date).delete()
+        self.refresh_latest_runs()
+        if partition is not None and partition.status == 'active':
+            invalidate_published_payloads(partition.valid_for_dates)
+
+        db = get_db()
+        db.drop_collection(self.collection_name(self.POINTS_COLLECTION_PREFIX, run_date))
+        db.drop_collection(self.collection_name(self.CLUSTERS_COLLECTION_PREFIX, run_date))
+        # The run's deltas describe points that no longer exist
+        FloodPointDelta.objects(forecast_run_date=run_date).delete()
+
+    def refresh_latest_runs(self):
+        """Point every served valid_for_date at the newest active run with points for it"""
+        latest = {}
+        for partition in self.active_partitions():
+            for valid_for_date in partition.valid_for_dates:
+                latest.setdefault(valid_for_date, partition.forecast_run_date)
+
+        updated_at = datetime.now(timezone.utc)
+        for valid_for_date, run_date in latest.items():
+            LatestForecastRun.objects(valid_for_date=valid_for_date).update_one(
+                set__forecast_run_date=run_date, set__updated_at=updated_at, upsert=True
+            )
+        LatestForecastRun.objects(valid_for_date__nin=list(latest)).delete()
+
+    def latest_runs(self) -> Dict[str, str]:
+        """Map each served valid_for_date to its latest run"""
+        pointers = list(LatestForecastRun.objects.only('valid_for_date', 'forecast_run_date').as_pymongo())
+        if not pointers and ForecastPartition.objects(status='active').first():
+            # Partitions activated before the pointers existed: build them on first read
+            self.refresh_latest_runs()
+            pointers = list(LatestForecastRun.objects.only('valid_for_date', 'forecast_run_date').as_pymongo())
+
+        return {pointer['valid_for_date']: pointer['forecast_run_date'] for pointer in pointers}
+
+    def latest_point_routes(self, valid_for_dates: List[str] = None) -> Dict[str, List[str]]:
+        """Group the given (default: all served) dates by the latest run holding them"""
+        routes = {}
+        for valid_for_date, run_date in sorted(self.latest_runs().items()):
+            if valid_for_dates is None or valid_for_date in valid_for_dates:
+                routes.setdefault(run_date, []).append(valid_for_date)
+        return routes
+
+    def serves_snapshot(self, snapshot) -> bool:
+        """
+        Check that a snapshot holds the points reads are served from: those of
+        the date's latest run, as of that run's latest activation
+        """
+        run_date = self.latest_runs().get(snapshot.valid_for_date)
+        if run_date is None or run_date != snapshot.forecast_run_date:
+            return False
+
+        return snapshot.partition_version == self.partition_version(run_date)
+
+    def partition_version(self, run_date: str) -> int:
+        """Get the activation count of a run's partition (0 while it has never been active)"""
+        partition = ForecastPartition.objects(forecast_run_date=run_date).only('version').first()
+        return partition.version if partition is not None else 0
+
+    def source_run_date(self, valid_for_date: str, run_date: str = None) -> Optional[str]:
+        """
+        Get the run whose points are the forecast to use for a date: run_date
+        itself when it has points for the date (e.g. a run still building),
+        otherwise the date's latest run.
+        """
+        if run_date and self.points(run_date)(valid_for_date=valid_for_date).only('id').first():
+            return run_date
+        return self.latest_runs().get(valid_for_date)
+
+    def drop_partitions_before(self, cutoff_run_date: str) -> List[str]:
+        """Retention: drop every partition older than the cutoff run date"""
+        run_dates = ForecastPartition.objects(forecast_run_date__lt=cutoff_run_date).distinct('forecast_run_date')
+        for run_date in run_dates:
+            self.drop_partition(run_date)
+        return run_dates
+
+    def active_partitions(self) -> List[ForecastPartition]:
+        """Get the active partitions, newest run first"""
+        return list(ForecastPartition.objects(status='active').order_by('-forecast_run_date'))
+
+    def active_run_dates(self) -> List[str]:
+        return [partition.forecast_run_date for partition in self.active_partitions()]
+
+    def retained_run_dates(self) -> List[str]:
+        """Get every partition's run date, including ones still building, newest first"""
+        return sorted(ForecastPartition.objects.distinct('forecast_run_date'), reverse=True)
+
+    def latest_run_date(self) -> Optional[str]:
+        run_dates = self.active_run_dates()
+        return run_dates[0] if run_dates else None
+
+    def available_dates(self) -> List[str]:
+        """Get every valid_for_date that has points in an active partition"""
+        return sorted(self.latest_runs())
+
+    def latest_point_queries(self, filters: Dict) -> Iterator[Tuple[str, Dict]]:
+        """
+        Split a point query into one query per latest run, each restricted to
+        the dates that run is the latest forecast for. valid_for_date leads
+        every point index, so superseded runs' points are never scanned.
+        """
+        filters = dict(filters)
+        wanted_dates = None
+        if 'valid_for_date' in filters:
+            wanted_dates = [filters.pop('valid_for_date')]
+        elif 'valid_for_date__in' in filters:
+            wanted_dates = list(filters.pop('valid_for_date__in'))
+
+        for run_date, dates in self.latest_point_routes(wanted_dates).items():
+            date_filter = {'valid_for_date': dates[0]} if len(dates) == 1 else {'valid_for_date__in': dates}
+            yield run_date, {**date_filter, **filters}
+
+    def iter_points(self, run_dates: List[str] = None, **filters) -> Iterator[SignificantFloodPoint]:
+        """Fan a point query out over the given partitions (default: the latest run of each date)"""
+        if run_dates is not None:
+            for run_date in run_dates:
+                yield from self.points(run_date)(**filters)
+            return
+
+        for run_date, run_filters in self.latest_point_queries(filters):
+            yield from self.points(run_date)(**run_filters)
+
+    def find_points(self, skip: int = 0, limit: int = None, only: List[str] = None,
+                    **filters) -> Tuple[List, int]:
+        """
+        Fan a paginated point query out over the latest run of each date.
+        Each partition is counted with its own indexes, so skip only reads
+        documents from the partition the page starts in. Pass only to get
+        raw dicts with just those fields, which a covering index can answer
+        without fetching the documents.
+        """
+        points, total = [], 0
+        for run_date, run_filters in self.latest_point_queries(filters):
+            queryset = self.points(run_date)(**run_filters)
+            count = queryset.count()
+            if only:
+                queryset = queryset.only(*only).as_pymongo()
+            total += count
+
+            if skip >= count:
+                skip -= count
+                continue
+
+            remaining = None if limit is None else limit - len(points)
+            if remaining is None or remaining > 0:
+                page = queryset.skip(skip)
+                if remaining is not None:
+                    page = page.limit(remaining)
+                points.extend(page)
+            skip = 0
+
+        return points, total
+
+    def cluster_partitions(self) -> Dict[str, str]:
+        """
+        Map each date to its latest run, where that run has clustered it. A
+        date its latest run hasn't clustered has no clusters, rather than
+        clusters of a superseded forecast.
+        """
+        cluster_dates = {
+            partition.forecast_run_date: set(partition.cluster_dates)
+            for partition in self.active_partitions()
+        }
+        return {
+            date: run_date for date, run_date in self.latest_runs().items()
+            if date in cluster_dates.get(run_date, ())
+        }
+
+    def iter_clusters(self, time: str = None, only: List[str] = None, times: List[str] = None,
+                      **filters) -> Iterator[FloodCluster]:
+        """
+        Query clusters from the latest run of each date, so clusters of
+        superseded forecasts are never read. Several dates
+        (times) held by one partition are read with a single query. Pass
+        only to load a subset of the fields.
+        """
+        wanted_dates = {time} if time else (set(times) if times else None)
+
+        dates_by_run = {}
+        for date, run_date in self.cluster_partitions().items():
+            if wanted_dates is None or date in wanted_dates:
+                dates_by_run.setdefault(run_date, []).append(date)
+
+        for run_date, dates in dates_by_run.items():
+            date_filter = {'time': dates[0]} if len(dates) == 1 else {'time__in': dates}
+            clusters = self.clusters(run_date)(**date_filter, **filters)
+            yield from (clusters.only(*only) if only else clusters)
@@ -0,0 +1,110 @@
+import math
+from typing import Dict, Iterable, List, Tuple
+
+class ForecastSketchService:
+    """
+    Service for the mergeable forecast_value summaries stored on clusters.
+    Each summary is a fixed-bin histogram with log-spaced bins, so merging
+    two summaries is adding their counts and the result is exact for any
+    grouping of the same points.
+    """
+
+    # Discharge values span several orders of magnitude, so bins are log-spaced:
+    # BINS_PER_DECADE bins per factor of ten between HISTOGRAM_MIN and HISTOGRAM_MAX,
+    # plus one underflow and one overflow bin (~12% relative bin width)
+    HISTOGRAM_MIN = 10.0
+    HISTOGRAM_MAX = 1000000.0
+    BINS_PER_DECADE = 20
+
+    RETURN_PERIODS = ['2-year', '5-year', '20-year']
+
+    def __init__(self):
+        decades = math.log10(self.HISTOGRAM_MAX / self.HISTOGRAM_MIN)
+        self.inner_bins = int(round(decades * self.BINS_PER_DECADE))
+        self.bin_count = self.inner_bins + 2
+
+    def bin_index(self, value: float) -> int:
+        """Get the histogram bin a forecast value falls into"""
+        if value < self.HISTOGRAM_MIN:
+            return 0
+        if value >= self.HISTOGRAM_MAX:
+            return self.bin_count - 1
+        position = math.log10(value / self.HISTOGRAM_MIN) * self.BINS_PER_DECADE
+        return 1 + min(int(position), self.inner_bins - 1)
+
+    def bin_edges(self) -> List[float]:
+        """Get the edges of the inner bins; bin i spans edges[i - 1] to edges[i]"""
+        return [
+            self.HISTOGRAM_MIN * 10 ** (i / self.BINS_PER_DECADE)
+            for i in range(self.inner_bins + 1)
+        ]
+
+    def build_histogram(self, values: Iterable[float]) -> Tuple[List[int], List[int]]:
+        """Build a sparse histogram as parallel (bins, counts) lists"""
+        counts = {}
+        for value in values:
+            index = self.bin_index(value)
+            counts[index] = counts.get(index, 0) + 1
+        bins = sorted(counts)
+        return bins, [counts[index] for index in bins]
+
+    def merge_histograms(self, histograms: Iterable[Tuple[List[int], List[int]]]) -> Tuple[List[int], List[int]]:
+        """Merge sparse histograms by adding their counts"""
+        counts = {}
+        for bins, bin_counts in histograms:
+            for index, count in zip(bins, bin_counts):
+                counts[index] = counts.get(index, 0) + count
+        bins = sorted(counts)
+        return bins, [counts[index] for index in bins]
+
+    def count_return_periods(self, return_periods: Iterable[str]) -> Dict[str, int]:
+        counts = {return_period: 0 for return_period in self.RETURN_PERIODS}
+        for return_period in return_periods:
+            counts[return_period] = counts.get(return_period, 0) + 1
+        return counts
+
+    def merge_return_period_counts(self, all_counts: Iterable[Dict[str, int]]) -> Dict[str, int]:
+        merged = {return_period: 0 for return_period in self.RETURN_PERIODS}
+        for counts in all_counts:
+            for return_period, count in counts.items():
+                merged[return_period] = merged.get(return_period, 0) + count
+        return merged
+
+    def dense_counts(self, bins: List[int], counts: List[int]) -> List[int]:
+        """Expand a sparse histogram to one count per bin"""
+        dense = [0] * self.bin_count
+        for index, count in zip(bins, counts):
+            dense[index] += count
+        return dense
+
+    def quantiles(self, bins: List[int], counts: List[int], qs: List[float],
+                  min_value: float, max_value: float) -> Dict[float, float]:
+        """
+        Estimate quantiles from a histogram, interpolating log-linearly inside
+        the bin that holds each rank. The known min and max of the merged
+        clusters bound the open-ended under/overflow bins and tighten the rest.
+        """
+        total = sum(counts)
+        if total == 0:
+            return {q: None for q in qs}
+
+        edges = self.bin_edges()
+        result = {}
+        for q in qs:
+            rank = q * total
+            seen = 0
+            for index, count in zip(bins, counts):
+                if seen + count >= rank and count:
+                    lower = max(min_value, edges[index - 1] if index > 0 else min_value)
+                    upper = min(max_value, edges[index] if index <= self.inner_bins else max_value)
+                    fraction = (rank - seen) / count
+                    if lower > 0 and upper > lower:
+                        value = lower * (upper / lower) ** fraction
+                    else:
+                        value = lower + (upper - lower) * fraction
+                    result[q] = value
+                    break
+                seen += count
+            else:
+                result[q] = max_value
+        return result
@@ -0,0 +1,229 @@
+import os
+import mmap
+import struct
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config.snapshots import SNAPSHOT_DIR
+from services.clustering_service import GeohashClusteringService
+from services.partition_service import ForecastPartitionService
+
+# File layout (little endian, every section 8-byte aligned):
+#   header (incl. the partition version it was built from) | lat f64[n] | lon f64[n] | value f64[n] | return period u8[n]
+#   | cell keys char[cells * precision] | cell offsets u64[cells + 1]
+# Points are sorted by geohash cell, and offsets[i]:offsets[i + 1] are the
+# points of cell i, so a cell or prefix lookup is a binary search.
+HEADER = struct.Struct('<4sIQQII16s16s')
+MAGIC = b'FLDS'
+VERSION = 1
+
+# Geohash precision of the cells points are grouped by (~20-40km)
+CELL_PRECISION = 4
+
+# Return periods are stored as one byte each
+RETURN_PERIOD_CODES = ['2-year', '5-year', '20-year']
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def snapshot_path(valid_for_date: str, directory: str = SNAPSHOT_DIR) -> str:
+    """Get the snapshot file path for a date"""
+    return os.path.join(directory, f"flood_points_{valid_for_date}.snap")
+
+
+def write_snapshot(valid_for_date: str, forecast_run_date: str,
+                   points: Iterable[Tuple[float, float, float, str]],
+                   directory: str = SNAPSHOT_DIR, partition_version: int = 0) -> str:
+    """
+    Write an immutable columnar snapshot of (lat, lon, forecast_value,
+    return_period) points. The file is written next to its final name and
+    atomically renamed into place, so readers only ever see complete files.
+    """
+    geohash_service = GeohashClusteringService()
+    rows = sorted(
+        (geohash_service.encode_geohash(lat, lon, CELL_PRECISION), lat, lon, value, return_period)
+        for lat, lon, value, return_period in points
+    )
+
+    lats, lons, values = array('d'), array('d'), array('d')
+    codes = array('B')
+    cell_keys, offsets = [], array('Q')
+    for index, (cell, lat, lon, value, return_period) in enumerate(rows):
+        if not cell_keys or cell_keys[-1] != cell:
+            cell_keys.append(cell)
+            offsets.append(index)
+        lats.append(lat)
+        lons.append(lon)
+        values.append(value)
+        codes.append(RETURN_PERIOD_CODES.index(return_period))
+    offsets.append(len(rows))
+
+    keys_blob = ''.join(cell_keys).encode('ascii')
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(valid_for_date, directory)
+    temp_path = f"{path}.tmp-{os.getpid()}"
+
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(
+            MAGIC, VERSION, len(rows), len(cell_keys), CELL_PRECISION, partition_version,
+            valid_for_date.encode('ascii'), forecast_run_date.encode('ascii')
+        ))
+        for section in (lats.tobytes(), lons.tobytes(), values.tobytes(), codes.tobytes(), keys_blob):
+            file.write(section)
+            file.write(b'\0' * (_padded(len(section)) - len(section)))
+        file.write(offsets.tobytes())
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temp_path, path)
+    return path
+
+
+def build_snapshot(valid_for_date: str, forecast_run_date: str, directory: str = SNAPSHOT_DIR) -> str:
+    """
+    Write the snapshot for one date from the points of one forecast run.
+    Build it after the run is activated: it records the partition version
+    it was built from and is only served while that version is current.
+    """
+    partition_service = ForecastPartitionService()
+    points = partition_service.points(forecast_run_date)(
+        valid_for_date=valid_for_date
+    ).only('lat', 'lon', 'forecast_value', 'return_period').as_pymongo()
+
+    return write_snapshot(
+        valid_for_date, forecast_run_date,
+        ((point['lat'], point['lon'], point['forecast_value'], point['return_period']) for point in points),
+        directory, partition_service.partition_version(forecast_run_date)
+    )
+
+
+def prune_snapshots(keep_dates: List[str], directory: str = SNAPSHOT_DIR):
+    """Delete snapshot files for dates that are no longer served"""
+    if not os.path.isdir(directory):
+        return
+    keep = {os.path.basename(snapshot_path(date, directory)) for date in keep_dates}
+    for name in os.listdir(directory):
+        if name.startswith('flood_points_') and name.endswith('.snap') and name not in keep:
+            os.remove(os.path.join(directory, name))
+
+
+class FloodSnapshot:
+    """
+    A read-only, memory-mapped view of one snapshot file. Nothing is parsed
+    apart from the fixed-size header; the columns are views straight into
+    the page cache, which every worker process maps and shares.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            self.file_id = stat.st_ino
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, cell_count, precision, partition_version, valid_for_date, forecast_run_date = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a flood snapshot: {path}")
+
+        self.count = count
+        self.cell_count = cell_count
+        self.cell_precision = precision
+        self.partition_version = partition_version
+        self.valid_for_date = valid_for_date.rstrip(b'\0').decode('ascii')
+        self.forecast_run_date = forecast_run_date.rstrip(b'\0').decode('ascii')
+
+        view = memoryview(self._mmap)
+        offset = HEADER.size
+        self.lat = view[offset:offset + 8 * count].cast('d')
+        offset += 8 * count
+        self.lon = view[offset:offset + 8 * count].cast('d')
+        offset += 8 * count
+        self.forecast_value = view[offset:offset + 8 * count].cast('d')
+        offset += 8 * count
+        self.return_period_code = view[offset:offset + count]
+        offset += _padded(count)
+        self.cell_keys = view[offset:offset + cell_count * precision]
+        offset += _padded(cell_count * precision)
+        self.cell_offsets = view[offset:offset + 8 * (cell_count + 1)].cast('Q')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def cell_key(self, index: int) -> str:
+        start = index * self.cell_precision
+        return bytes(self.cell_keys[start:start + self.cell_precision]).decode('ascii')
+
+    def _first_cell_at_or_after(self, key: str) -> int:
+        low, high = 0, self.cell_count
+        while low < high:
+            mid = (low + high) // 2
+            if self.cell_key(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """Get the [start, end) point index range of every cell starting with prefix"""
+        cell_prefix = prefix[:self.cell_precision]
+        first = self._first_cell_at_or_after(cell_prefix)
+        last = self._first_cell_at_or_after(cell_prefix + '~')
+        return self.cell_offsets[first], self.cell_offsets[last]
+
+    def point(self, index: int) -> Dict:
+        return {
+            'lat': self.lat[index],
+            'lon': self.lon[index],
+            'forecast_value': self.forecast_value[index],
+            'return_period': RETURN_PERIOD_CODES[self.return_period_code[index]]
+        }
+
+    def points_in_geohash(self, geohash: str) -> Iterator[Tuple[int, Dict]]:
+        """
+        Yield (index, point) for every point inside a geohash cell. Prefixes
+        longer than the cell precision are narrowed down by the cell bounds.
+        """
+        start, end = self.prefix_range(geohash)
+        bounds = None
+        if len(geohash) > self.cell_precision:
+            bounds = GeohashClusteringService().decode_geohash_bounds(geohash)
+
+        for index in range(start, end):
+            if bounds is not None and not (
+                bounds['south'] <= self.lat[index] < bounds['north']
+                and bounds['west'] <= self.lon[index] < bounds['east']
+            ):
+                continue
+            yield index, self.point(index)
+
+
+class SnapshotStore:
+    """
+    Per-process cache of mapped snapshots. Each lookup is one stat() call;
+    when the pipeline renames a new file into place the inode changes and
+    the new file is mapped, while in-flight readers keep the old mapping.
+    """
+
+    def __init__(self, directory: str = SNAPSHOT_DIR):
+        self.directory = directory
+        self._snapshots = {}
+
+    def get(self, valid_for_date: str) -> Optional[FloodSnapshot]:
+        path = snapshot_path(valid_for_date, self.directory)
+        try:
+            file_id = os.stat(path).st_ino
+        except FileNotFoundError:
+            self._snapshots.pop(valid_for_date, None)
+            return None
+
+        snapshot = self._snapshots.get(valid_for_date)
+        if snapshot is None or snapshot.file_id != file_id:
+            snapshot = FloodSnapshot(path)
+            self._snapshots[valid_for_date] = snapshot
+        return snapshot
+
+
+# Shared by every request in this worker; mapping happens lazily on first use
+snapshot_store = SnapshotStore()